@@ -1,8 +1,19 @@
 from flask import Flask
 from flask_cors import CORS
 from .db import init_db
+from .data_versions import init_data_versions
+from .search_index import init_search_index
+from .fulltext import init_fulltext
+from .reports import init_reports
+from .imports import init_imports
+from .leaderboard import init_leaderboards
+from .shared_cache import init_shared_cache
+from .json_provider import FastJSONProvider
+from .compression import init_compression
+from .pool_metrics import init_pool_metrics
+from .query_metrics import init_query_metrics
 from .config import DevelopmentConfig # CHANGE to ProductionConfig when deploying
-from .routes import films, actors, rentals, auth, customers
+from .routes import films, actors, rentals, auth, customers, admin
 
 def create_app(config_class=DevelopmentConfig):
     # Create Flask application instance
@@ -11,18 +22,48 @@ def create_app(config_class=DevelopmentConfig):
     # Prevent loading default config values and load from config class instead
     app.config.from_object(config_class)
 
+    # Serialize JSON with orjson (handles datetime/Decimal natively)
+    app.json = FastJSONProvider(app)
+
+    # Count and time the queries behind each request
+    init_query_metrics(app)
+
+    # Compress large responses
+    init_compression(app)
+
     # Enable CORS
     CORS(app, origins=app.config["CORS_ORIGINS"], supports_credentials=True) 
     
-    # Initialize database
+    # Instrument the connection pool, then initialize database
+    init_pool_metrics(app)
     init_db(app) 
 
+    # Create the version counters behind cheap conditional-GET probes
+    init_data_versions(app)
+
+    # Build the in-memory film search index
+    init_search_index(app)
+
+    # Pick the full-text search backend (detected on first search)
+    init_fulltext(app)
+
+    # Build the top-5 leaderboards
+    init_leaderboards(app)
+
+    # Open the cache shared between workers
+    init_shared_cache(app)
+
+    # Report and import commands (flask overdue-report, flask import-customers)
+    init_reports(app)
+    init_imports(app)
+
     # Register blueprints
     app.register_blueprint(films.bp, url_prefix="/api/films")
     app.register_blueprint(actors.bp, url_prefix="/api/actors")
     app.register_blueprint(rentals.bp, url_prefix="/api/rentals")
     app.register_blueprint(auth.bp, url_prefix="/api/auth")
     app.register_blueprint(customers.bp, url_prefix="/api/customers")
+    app.register_blueprint(admin.bp, url_prefix="/api/admin")
 
     # Health check
     @app.get("/api/health")
@@ -0,0 +1,144 @@
+from contextlib import asynccontextmanager
+from functools import wraps
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.http import http_date, parse_date, parse_etags
+from . import create_app
+from .async_db import AsyncSessionMiddleware, dispose_async_db, init_async_db
+from .config import DevelopmentConfig # CHANGE to ProductionConfig when deploying
+from .json_provider import dumps_bytes
+from .routes.conditional import http_last_modified, resource_etag
+from .services import async_actor_service, async_film_service, async_version_service
+from .shared_cache import async_resource_version
+
+'''
+    Run a native route the way the Flask app runs the same endpoint: inside the Flask app context (for the shared cache
+    and logging) and, given a probe (async_version_service), as a conditional GET with the same weak ETag,
+    Last-Modified and 304 handling as routes.conditional. The probed version keys the view's shared-cache lookups.
+'''
+def native(probe=None):
+    def decorator(endpoint):
+        @wraps(endpoint)
+        async def wrapper(request):
+            flask_app = request.app.state.flask_app
+            with flask_app.app_context():
+                if probe is None or not flask_app.config.get("CONDITIONAL_GET_ENABLED"):
+                    return await endpoint(request)
+                return await _conditional(request, probe, endpoint)
+        return wrapper
+    return decorator
+
+async def _conditional(request, probe, endpoint):
+    probed = await probe(**request.path_params)
+    if probed is None:
+        return await endpoint(request)
+
+    version, last_modified = probed
+    etag = resource_etag(f"{request.url.path}?{request.url.query}", version)
+    last_modified = http_last_modified(last_modified)
+    if request.headers.get("if-none-match"):
+        not_modified = parse_etags(request.headers["if-none-match"]).contains_weak(etag)
+    else:
+        since = parse_date(request.headers.get("if-modified-since"))
+        not_modified = since is not None and last_modified is not None and last_modified <= since
+
+    if not_modified:
+        response = Response(status_code=304)
+    else:
+        token = async_resource_version.set(version)
+        try:
+            response = await endpoint(request)
+        finally:
+            async_resource_version.reset(token)
+    if response.status_code in (200, 304):
+        response.headers["ETag"] = f'W/"{etag}"'
+        if last_modified is not None:
+            response.headers["Last-Modified"] = http_date(last_modified)
+        # Let browsers and CDNs keep the body but revalidate every time
+        response.headers["Cache-Control"] = "no-cache, private" if "authorization" in request.headers else "no-cache"
+    return response
+
+
+class JSONResponse(Response):
+    ''' JSON response encoded the same way as the Flask app's FastJSONProvider '''
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps_bytes(content)
+
+'''
+    GET /api/films/<film_id>
+    Returns details for a single film.
+'''
+@native(async_version_service.film_version)
+async def film_detail(request):
+    film = await async_film_service.film_detail(request.path_params["film_id"])
+    if not film:
+        return JSONResponse({"error": "Film not found"}, 404)
+    return JSONResponse(film)
+
+''' GET /api/films/search/<title|actor|genre>?q=<search_term> '''
+def _film_search(search):
+    @native(async_version_service.search_index_version)
+    async def endpoint(request):
+        search_term = request.query_params.get('q', '')
+        if not search_term:
+            return JSONResponse({"error": "Search term is required"}, 400)
+        return JSONResponse(await search(search_term))
+    return endpoint
+
+'''
+    GET /api/actors/<actor_id>
+    Returns actor details.
+'''
+@native(async_version_service.actor_version)
+async def get_actor(request):
+    data = await async_actor_service.actor_detail(request.path_params["actor_id"])
+    if not data:
+        return JSONResponse({"error": "Actor not found"}, 404)
+    return JSONResponse(data)
+
+'''
+    ASGI entry point: film and actor details run natively on asyncio with AsyncSession, so a worker keeps serving
+    while those queries wait on the database; so do the title/actor/genre searches when the in-memory search index is off.
+    Every other route, including the leaderboard-backed top-5 lists, is the regular Flask app mounted underneath,
+    so the full API is available from one server (e.g. uvicorn asgi:app).
+'''
+def create_asgi_app(config_class=DevelopmentConfig):
+    flask_app = create_app(config_class)
+    init_async_db(flask_app.config)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await dispose_async_db()
+
+    routes = [
+        Route("/api/films/{film_id:int}", film_detail, methods=["GET"]),
+        Route("/api/actors/{actor_id:int}", get_actor, methods=["GET"]),
+    ]
+    # With the index on, the Flask routes answer searches from memory, which beats any query
+    if not flask_app.config.get("SEARCH_INDEX_ENABLED"):
+        routes += [
+            Route("/api/films/search/title", _film_search(async_film_service.search_films_by_title), methods=["GET"]),
+            Route("/api/films/search/actor", _film_search(async_film_service.search_films_by_actor), methods=["GET"]),
+            Route("/api/films/search/genre", _film_search(async_film_service.search_films_by_genre), methods=["GET"]),
+        ]
+    routes.append(Mount("/", app=WSGIMiddleware(flask_app)))
+    middleware = [
+        Middleware(
+            CORSMiddleware,
+            allow_origins=flask_app.config["CORS_ORIGINS"],
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        ),
+        Middleware(AsyncSessionMiddleware),
+    ]
+    app = Starlette(routes=routes, middleware=middleware, lifespan=lifespan)
+    app.state.flask_app = flask_app
+    return app
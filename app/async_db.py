@@ -0,0 +1,62 @@
+from contextvars import ContextVar
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+# Sync driver -> asyncio driver for the same database
+ASYNC_DRIVERS = {
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+# The asyncio engine and session factory, set up by init_async_db
+async_db = {}
+
+# Per-request holder for the lazily created AsyncSession (see AsyncSessionMiddleware)
+_request_session = ContextVar("async_session", default=None)
+
+''' Rewrite a sync SQLAlchemy URI to use the matching asyncio driver '''
+def async_database_uri(uri: str):
+    scheme, sep, rest = uri.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+def init_async_db(config):
+    # The sync pool class (e.g. the instrumented QueuePool) can't drive an asyncio engine
+    options = {k: v for k, v in config.get("SQLALCHEMY_ENGINE_OPTIONS", {}).items() if k != "poolclass"}
+    engine = create_async_engine(async_database_uri(config["SQLALCHEMY_DATABASE_URI"]), **options)
+    async_db["engine"] = engine
+    async_db["sessionmaker"] = async_sessionmaker(engine, expire_on_commit=False)
+
+async def dispose_async_db():
+    engine = async_db.pop("engine", None)
+    if engine is not None:
+        await engine.dispose()
+
+''' Async counterpart of db.get_session: the current request's AsyncSession, created on first use '''
+def get_async_session():
+    holder = _request_session.get()
+    if holder is None:
+        raise RuntimeError("get_async_session() called outside an ASGI request")
+    if not holder:
+        holder.append(async_db["sessionmaker"]())
+    return holder[0]
+
+class AsyncSessionMiddleware:
+    ''' ASGI middleware giving each request its own AsyncSession and closing it when the response is done '''
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        holder = []
+        token = _request_session.set(holder)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_session.reset(token)
+            if holder:
+                await holder[0].close()
@@ -0,0 +1,53 @@
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip is offered
+    brotli = None
+
+''' Pick the best encoding the client accepts that we can produce, or None '''
+def _negotiate():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+''' Compress buffered responses above COMPRESS_MIN_SIZE bytes with brotli or gzip, per Accept-Encoding '''
+def init_compression(app):
+    if not app.config.get("COMPRESS_ENABLED"):
+        return
+
+    min_size = app.config["COMPRESS_MIN_SIZE"]
+    level = app.config["COMPRESS_LEVEL"]
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        if (response.content_length or 0) < min_size:
+            return response
+
+        encoding = _negotiate()
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if encoding == "br":
+            # Brotli quality runs 0-11; map the gzip-style 1-9 level onto it
+            compressed = brotli.compress(data, quality=min(11, level + 1))
+        else:
+            compressed = gzip.compress(data, compresslevel=level)
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        return response
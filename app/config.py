@@ -3,26 +3,102 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+''' Pool settings from <env_prefix>_* environment variables (DB_POOL_SIZE etc.), falling back to the given per-config defaults '''
+def _engine_options(pool_size: int, max_overflow: int, pool_timeout: int = 10, pool_recycle: int = 1800, env_prefix: str = "DB_POOL"):
+    return {
+        "pool_size": int(os.getenv(f"{env_prefix}_SIZE", pool_size)),
+        "max_overflow": int(os.getenv(f"{env_prefix}_MAX_OVERFLOW", max_overflow)),
+        "pool_timeout": int(os.getenv(f"{env_prefix}_TIMEOUT", pool_timeout)),
+        "pool_recycle": int(os.getenv(f"{env_prefix}_RECYCLE", pool_recycle)),
+        "pool_pre_ping": os.getenv(f"{env_prefix}_PRE_PING", "true").lower() == "true",
+    }
+
 class Config: 
     SQLALCHEMY_DATABASE_URI = (
         f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
         f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?charset=utf8mb4"
     )
 
-    # Make sure to ping the database connection before using it to prevent "lost connection" errors
-    SQLALCHEMY_ENGINE_OPTIONS = {"pool_pre_ping": True}
+    # Connection pool, sized per config class and overridable from the environment (see _engine_options).
+    # Connections are pinged on checkout (DB_POOL_PRE_PING=false turns it off) and recycled before MySQL's wait_timeout
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(pool_size=5, max_overflow=10)
+
+    # Read replicas (comma-separated SQLAlchemy URIs) for @read_replica service functions; see db.Replicas.
+    # Strategy is round_robin or least_connections; replicas further than REPLICA_MAX_LAG_SECONDS behind are skipped
+    SQLALCHEMY_REPLICA_URIS = [uri for uri in os.getenv("DB_REPLICA_URIS", "").split(",") if uri]
+    # Pool for each replica engine, sized separately from the primary's through DB_REPLICA_POOL_* variables
+    SQLALCHEMY_REPLICA_ENGINE_OPTIONS = _engine_options(pool_size=5, max_overflow=10, env_prefix="DB_REPLICA_POOL")
+    REPLICA_STRATEGY = os.getenv("REPLICA_STRATEGY", "round_robin")
+    REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "5"))
+
+    # Record checkout waits, connection ages, invalidations etc. (served at /api/admin/pool)
+    POOL_METRICS_ENABLED = os.getenv("POOL_METRICS_ENABLED", "true").lower() == "true"
 
     # Docs told me to do this to reduce overhead since Flask-SQLAlchemy inherently tracks changes to DB models and emits signals
     SQLALCHEMY_TRACK_MODIFICATIONS = False 
 
+    # Optional on-disk JSON copy of the reflected schema so workers skip reflection at startup.
+    # It is checked against a one-query schema fingerprint unless SCHEMA_SNAPSHOT_VALIDATE is false (then boot needs no DB round trip).
+    SCHEMA_SNAPSHOT_PATH = os.getenv("SCHEMA_SNAPSHOT_PATH")
+    SCHEMA_SNAPSHOT_VALIDATE = os.getenv("SCHEMA_SNAPSHOT_VALIDATE", "true").lower() == "true"
+
+    # Answer If-None-Match / If-Modified-Since on GET endpoints from last_update probes (see routes/conditional.py)
+    CONDITIONAL_GET_ENABLED = os.getenv("CONDITIONAL_GET_ENABLED", "true").lower() == "true"
+    # Zone of the naive DATETIME/TIMESTAMP values the database returns (MySQL's session time_zone), e.g. "Europe/Berlin";
+    # used to turn last_update into Last-Modified. Unset means the app server's local time zone.
+    DB_TIMEZONE = os.getenv("DB_TIMEZONE")
+
+    # gzip (or brotli, when installed) for JSON responses of at least COMPRESS_MIN_SIZE bytes
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "5"))
+
+    # Per-request query counting/timing (see query_metrics.py): Server-Timing header, slow-request and N+1 logs
+    QUERY_METRICS_ENABLED = os.getenv("QUERY_METRICS_ENABLED", "false").lower() == "true"
+    SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", "500"))
+    N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
     # CORS
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "").split(",") if os.getenv("CORS_ORIGINS") else []
 
     # For user authentication
     SECRET_KEY = os.getenv('SECRET_KEY')
 
+    # Seconds a verified token (capped at its exp) and a staff member's existence and active flag are trusted without re-checking
+    AUTH_TOKEN_CACHE_TTL = int(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+    AUTH_STAFF_CACHE_TTL = int(os.getenv("AUTH_STAFF_CACHE_TTL", "60"))
+
+    # In-memory film search index (see search_index.py), refreshed by polling last_update every N seconds
+    SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "true").lower() == "true"
+    SEARCH_INDEX_REFRESH_SECONDS = int(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "30"))
+
+    # Full-text film search (see fulltext.py): auto uses the database's FULLTEXT/FTS5 index on film_text when present, else ilike.
+    # Set to mysql, fts5 or like to force one; `flask fulltext-index` creates the native index
+    FULLTEXT_BACKEND = os.getenv("FULLTEXT_BACKEND", "auto")
+
+    # In-memory top-5 leaderboards (see leaderboard.py), polled for other workers' rentals every N seconds
+    LEADERBOARD_ENABLED = os.getenv("LEADERBOARD_ENABLED", "true").lower() == "true"
+    LEADERBOARD_REFRESH_SECONDS = int(os.getenv("LEADERBOARD_REFRESH_SECONDS", "10"))
+
+    # Cache shared by all workers on the host (SQLite file, see shared_cache.py); SHARED_CACHE_PATH defaults to a per-database file
+    # under the app's instance folder. The directory and file must be owned by the app user and not group/world-writable
+    SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "true").lower() == "true"
+    SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH")
+    SHARED_CACHE_MAX_BYTES = int(os.getenv("SHARED_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    SHARED_CACHE_TTL = int(os.getenv("SHARED_CACHE_TTL", "60"))
+
+    # Most rented films kept in memory per actor, i.e. the largest page /api/actors/<id>/top5films serves without SQL
+    ACTOR_TOP_FILMS_SIZE = int(os.getenv("ACTOR_TOP_FILMS_SIZE", "20"))
+
 class DevelopmentConfig(Config):
     DEBUG = True
+    QUERY_METRICS_ENABLED = os.getenv("QUERY_METRICS_ENABLED", "true").lower() == "true"
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(pool_size=2, max_overflow=3)
+    SQLALCHEMY_REPLICA_ENGINE_OPTIONS = _engine_options(pool_size=2, max_overflow=3, env_prefix="DB_REPLICA_POOL")
 
 class ProductionConfig(Config):
     DEBUG = False
+    # Per worker; keep pool_size + max_overflow times the worker count under MySQL's max_connections
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(pool_size=10, max_overflow=20, pool_timeout=5)
+    SQLALCHEMY_REPLICA_ENGINE_OPTIONS = _engine_options(pool_size=10, max_overflow=20, pool_timeout=5, env_prefix="DB_REPLICA_POOL")
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from .db import db
+
+# Named counters kept in data_version; each is bumped in the same transaction as the writes it covers
+COUNTERS = ("customers",)
+
+# Row whose last_update the primary keeps moving, so a replica's copy shows how far behind it is (see db.Replicas)
+HEARTBEAT = "heartbeat"
+
+metadata = MetaData()
+
+data_version = Table(
+    "data_version", metadata,
+    Column("name", String(64), primary_key=True),
+    Column("version", Integer, nullable=False, default=0),
+    Column("last_update", DateTime, nullable=False),
+)
+
+
+class DataVersions:
+    '''
+        Version counters for data whose conditional-GET probe would otherwise scan whole tables.
+        A write bumps its counter inside its own transaction, so a probe reads one primary-key row instead of
+        COUNT(*)/MAX(last_update) over the table. The table is created by `flask data-versions-create`, never at startup;
+        until it exists (with all its rows) the counters stay disabled and callers fall back to probing the tables.
+    '''
+
+    def __init__(self):
+        self.enabled = False
+
+    def configure(self, app):
+        self.enabled = False
+        with app.app_context():
+            try:
+                missing = self._missing()
+            except Exception as e:
+                app.logger.warning(f"Data version counters unavailable, falling back to table probes: {str(e)}")
+                return
+            if missing:
+                app.logger.info(f"Data version counters disabled (missing {', '.join(missing)}), run `flask data-versions-create`")
+                return
+            self.enabled = True
+
+    ''' Names of the table or rows that still need creating, empty when the counters are ready '''
+    def _missing(self):
+        with db.engine.connect() as conn:
+            if not db.engine.dialect.has_table(conn, data_version.name):
+                return [data_version.name]
+            existing = set(conn.execute(select(data_version.c.name)).scalars())
+        return [name for name in (*COUNTERS, HEARTBEAT) if name not in existing]
+
+    ''' Create the table if needed and seed any missing rows (the data-versions-create command) '''
+    def create(self):
+        metadata.create_all(db.engine, checkfirst=True)
+        for name in self._missing():
+            self._seed(name)
+
+    def _seed(self, name: str):
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(insert(data_version).values(name=name, version=0, last_update=datetime.now()))
+        except IntegrityError:
+            pass  # another worker seeded it first
+
+    ''' Bump a counter in the session's current transaction; call it next to the writes, before commit '''
+    def bump(self, session, name: str):
+        if not self.enabled:
+            return
+        session.execute(
+            update(data_version)
+            .where(data_version.c.name == name)
+            .values(version=data_version.c.version + 1, last_update=datetime.now())
+        )
+
+    ''' Scalar subqueries for a counter's (version, last_update), for version probes '''
+    def columns(self, name: str):
+        return [
+            select(data_version.c.version).where(data_version.c.name == name).scalar_subquery(),
+            select(data_version.c.last_update).where(data_version.c.name == name).scalar_subquery(),
+        ]
+
+    '''
+        Move the heartbeat to now on the primary connection, unless some worker already did within the last interval seconds;
+        the condition keeps it to about one write per interval however many workers check.
+    '''
+    def beat(self, conn, interval: float):
+        now = datetime.now()
+        conn.execute(
+            update(data_version)
+            .where(data_version.c.name == HEARTBEAT, data_version.c.last_update < now - timedelta(seconds=interval))
+            .values(version=data_version.c.version + 1, last_update=now)
+        )
+
+    ''' The heartbeat time as seen through conn '''
+    def heartbeat(self, conn):
+        return conn.execute(select(data_version.c.last_update).where(data_version.c.name == HEARTBEAT)).scalar()
+
+
+data_versions = DataVersions()
+
+def init_data_versions(app):
+    data_versions.configure(app)
+
+    @app.cli.command("data-versions-create")
+    def data_versions_create():
+        ''' Create and seed the data_version table; workers use the counters from their next start '''
+        missing = data_versions._missing()
+        if not missing:
+            click.echo("data_version table already exists")
+            return
+        data_versions.create()
+        click.echo(f"Created {', '.join(missing)}")
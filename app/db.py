@@ -1,8 +1,45 @@
+import ast
+import hashlib
+import importlib
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from inspect import isgeneratorfunction
+import sqlalchemy
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import func, select, text
 from sqlalchemy.ext.automap import automap_base
 
+
+class RoutingSession(Session):
+    '''
+        Sends statements issued inside @read_replica functions to a replica (one per session, so a request reads one snapshot).
+        Everything else goes to the primary, and so does every read after this session has written,
+        so e.g. create_rental -> get_rental_details reads its own insert.
+    '''
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing:
+            if clause is not None and getattr(clause, "is_dml", False):
+                self.info["wrote"] = True
+            elif getattr(clause, "_for_update_arg", None) is not None:
+                pass  # locking reads belong on the primary
+            elif self.info.get("replica_reads") and not self.info.get("wrote"):
+                if "replica" not in self.info:
+                    self.info["replica"] = replicas.choose()
+                if self.info["replica"] is not None:
+                    return self.info["replica"]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
 # Connects to DB, gives you a session
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # Stores all the Sakila tables as classes
 Base = automap_base()
@@ -10,11 +47,347 @@ Base = automap_base()
 # Storing Base.classes into models dict- keys represent table names and values are python ORM classes
 models = {}
 
+# Bump whenever the snapshot layout changes so old files are ignored instead of misread
+SCHEMA_SNAPSHOT_FORMAT = 2
+
 def init_db(app):
     db.init_app(app)
+    replicas.configure(app)
     with app.app_context():
-        Base.prepare(db.engine, reflect=True)
+        snapshot_path = app.config.get("SCHEMA_SNAPSHOT_PATH")
+        if not snapshot_path or not _load_schema_snapshot(app, snapshot_path):
+            Base.metadata.reflect(db.engine)
+            if snapshot_path:
+                _save_schema_snapshot(app, snapshot_path)
+        Base.prepare()
         models.update(Base.classes)
 
 def get_session():
-    return db.session
\ No newline at end of file
+    return db.session
+
+@sqlalchemy.event.listens_for(RoutingSession, "after_flush")
+def _pin_to_primary(session, flush_context):
+    session.info["wrote"] = True
+
+@contextmanager
+def _replica_reads():
+    info = db.session().info
+    info["replica_reads"] = info.get("replica_reads", 0) + 1
+    try:
+        yield
+    finally:
+        info["replica_reads"] -= 1
+
+''' Mark a read-only service function so its queries may go to a replica (generators are covered while they run) '''
+def read_replica(f):
+    if isgeneratorfunction(f):
+        @wraps(f)
+        def generator(*args, **kwargs):
+            with _replica_reads():
+                yield from f(*args, **kwargs)
+        return generator
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        with _replica_reads():
+            return f(*args, **kwargs)
+    return wrapper
+
+
+class Replica:
+    ''' One read replica engine and what the last lag check found '''
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.lag = None       # seconds behind the primary, None until checked
+        self.healthy = True
+        self.error = None
+
+    def status(self):
+        return {
+            "url": self.engine.url.render_as_string(hide_password=True),
+            "healthy": self.healthy,
+            "lag_s": self.lag,
+            "error": self.error,
+        }
+
+
+class Replicas:
+    '''
+        Read replica engines from SQLALCHEMY_REPLICA_URIS, picked round-robin or by fewest checked-out connections.
+        Lag is re-checked at most every REPLICA_LAG_CHECK_SECONDS; replicas that are unreachable or more than
+        REPLICA_MAX_LAG_SECONDS behind are skipped, and with none left reads stay on the primary.
+    '''
+
+    def __init__(self):
+        self.replicas = []
+        self.strategy = "round_robin"
+        self.max_lag = 5.0
+        self.check_seconds = 5.0
+        self.lag_table = "rental"
+        self._primary = None
+        self._counter = itertools.count()
+        self._check_lock = threading.Lock()
+        self._last_check = 0.0
+        self._heartbeat = None  # the primary's heartbeat as of the previous check
+
+    def configure(self, app):
+        for replica in self.replicas:
+            replica.engine.dispose()
+        options = app.config.get("SQLALCHEMY_REPLICA_ENGINE_OPTIONS", {})
+        self.replicas = [Replica(sqlalchemy.create_engine(uri, **options)) for uri in app.config.get("SQLALCHEMY_REPLICA_URIS", [])]
+        self.strategy = app.config.get("REPLICA_STRATEGY", "round_robin")
+        self.max_lag = app.config.get("REPLICA_MAX_LAG_SECONDS", 5.0)
+        self.check_seconds = app.config.get("REPLICA_LAG_CHECK_SECONDS", 5.0)
+        self.lag_table = app.config.get("REPLICA_LAG_TABLE", "rental")
+        self._last_check = 0.0
+        self._heartbeat = None
+        with app.app_context():
+            self._primary = db.engine
+
+    ''' The replica engine for a new session's reads, or None for the primary '''
+    def choose(self):
+        if not self.replicas:
+            return None
+        self._maybe_check_lag()
+        usable = [r for r in self.replicas if r.healthy and (r.lag is None or r.lag <= self.max_lag)]
+        if not usable:
+            return None
+        if self.strategy == "least_connections":
+            return min(usable, key=lambda r: _checked_out(r.engine)).engine
+        return usable[next(self._counter) % len(usable)].engine
+
+    def _maybe_check_lag(self):
+        if time.monotonic() - self._last_check < self.check_seconds:
+            return
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            self.check_lag()
+        finally:
+            self._check_lock.release()
+
+    '''
+        Measure every replica's lag now. Without replication status to ask, the replica's copy of the heartbeat row
+        (see data_versions) is compared with the heartbeat the primary had at the previous check: a replica that has it is
+        less than a check interval behind (reported as 0), otherwise it is as far behind as its own heartbeat is old.
+        The heartbeat moves even when nothing else is written, so an idle database doesn't look behind.
+        Only without the heartbeat table is MAX(last_update) of lag_table compared.
+    '''
+    def check_lag(self):
+        from .data_versions import data_versions
+
+        self._last_check = time.monotonic()
+        use_heartbeat = data_versions.enabled
+        latest_write = data_versions.heartbeat if use_heartbeat else self._latest_write
+        seconds_behind = _heartbeat_lag if use_heartbeat else _seconds_between
+        primary_latest = self._heartbeat if use_heartbeat else None
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    lag = _replication_status_lag(conn)
+                    if lag is None:
+                        if primary_latest is None:
+                            with self._primary.connect() as primary_conn:
+                                primary_latest = latest_write(primary_conn)
+                        lag = seconds_behind(latest_write(conn), primary_latest)
+                replica.lag, replica.healthy, replica.error = lag, True, None
+            except Exception as e:
+                replica.healthy, replica.error = False, str(e)
+
+        if use_heartbeat:
+            try:
+                # Beating at half the check interval keeps the heartbeat fresher than one check apart
+                with self._primary.begin() as primary_conn:
+                    data_versions.beat(primary_conn, self.check_seconds / 2)
+                    self._heartbeat = data_versions.heartbeat(primary_conn)
+            except Exception as e:
+                current_app.logger.warning(f"Replica heartbeat failed: {str(e)}")
+
+    def _latest_write(self, conn):
+        t = models[self.lag_table]
+        return conn.execute(select(func.max(t.last_update))).scalar()
+
+    def status(self):
+        return [replica.status() for replica in self.replicas]
+
+replicas = Replicas()
+
+def _checked_out(engine):
+    pool = engine.pool
+    return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+''' Lag the server reports about itself (MySQL replication status), or None to fall back to comparing writes '''
+def _replication_status_lag(conn):
+    if conn.dialect.name != "mysql":
+        return None
+    for statement, column in (("SHOW REPLICA STATUS", "Seconds_Behind_Source"), ("SHOW SLAVE STATUS", "Seconds_Behind_Master")):
+        try:
+            row = conn.execute(text(statement)).mappings().first()
+        except Exception:
+            continue
+        if row is None:
+            return None
+        if row.get(column) is None:
+            raise RuntimeError("Replication is not running")
+        return float(row[column])
+    return None
+
+''' Seconds of primary writes the replica hasn't applied yet: the gap between their newest last_update values '''
+def _seconds_between(replica_latest: datetime, primary_latest: datetime):
+    if primary_latest is None or replica_latest is None:
+        return 0.0 if primary_latest is None else float("inf")
+    return max(0.0, (primary_latest - replica_latest).total_seconds())
+
+''' Lag from heartbeats: 0 when the replica has the primary's previous heartbeat, else the age of the replica's own '''
+def _heartbeat_lag(replica_beat: datetime, primary_beat: datetime):
+    if replica_beat is None:
+        return float("inf")
+    if primary_beat is None or replica_beat >= primary_beat:
+        return 0.0
+    return max(0.0, (datetime.now() - replica_beat).total_seconds())
+
+'''
+    Cheap digest of the live schema: one catalog query instead of per-table reflection.
+    Returns None for dialects we don't know how to fingerprint, which forces reflection.
+'''
+def schema_fingerprint(engine):
+    dialect = engine.dialect.name
+    if dialect == "mysql":
+        queries = [
+            "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_DEFAULT, EXTRA "
+            "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, ORDINAL_POSITION",
+            "SELECT TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME "
+            "FROM information_schema.KEY_COLUMN_USAGE WHERE TABLE_SCHEMA = DATABASE() "
+            "ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION",
+        ]
+    elif dialect == "sqlite":
+        queries = ["SELECT type, name, sql FROM sqlite_master ORDER BY type, name"]
+    else:
+        return None
+
+    digest = hashlib.sha256()
+    with engine.connect() as conn:
+        for query in queries:
+            for row in conn.execute(text(query)):
+                digest.update(repr(tuple(row)).encode())
+    return digest.hexdigest()
+
+'''
+    Load reflected tables from a JSON snapshot into Base.metadata; returns False when the snapshot is missing or stale.
+    The file only holds table, column, index and foreign key definitions, so reading it never runs code from it.
+'''
+def _load_schema_snapshot(app, path):
+    try:
+        with open(path, "rb") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return False
+    except Exception as e:
+        app.logger.warning(f"Ignoring unreadable schema snapshot {path}: {str(e)}")
+        return False
+
+    if not isinstance(snapshot, dict) or snapshot.get("format") != SCHEMA_SNAPSHOT_FORMAT or snapshot.get("sqlalchemy") != sqlalchemy.__version__:
+        return False
+    if app.config.get("SCHEMA_SNAPSHOT_VALIDATE", True):
+        fingerprint = schema_fingerprint(db.engine)
+        if fingerprint is None or fingerprint != snapshot.get("fingerprint"):
+            app.logger.info("Schema snapshot is stale, reflecting the database")
+            return False
+
+    try:
+        metadata = sqlalchemy.MetaData()
+        for table in snapshot["tables"]:
+            _table_from_json(metadata, table)
+    except Exception as e:
+        app.logger.warning(f"Ignoring unreadable schema snapshot {path}: {str(e)}")
+        return False
+
+    for table in metadata.tables.values():
+        table.to_metadata(Base.metadata)
+    return True
+
+''' Write Base.metadata to a snapshot; written to a temp file and renamed so concurrent workers never see half a file '''
+def _save_schema_snapshot(app, path):
+    try:
+        snapshot = {
+            "format": SCHEMA_SNAPSHOT_FORMAT,
+            "sqlalchemy": sqlalchemy.__version__,
+            "fingerprint": schema_fingerprint(db.engine),
+            "tables": [_table_to_json(table) for table in Base.metadata.sorted_tables],
+        }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        app.logger.warning(f"Failed to write schema snapshot {path}: {str(e)}")
+
+'''
+    A reflected column type as its module and repr, e.g. ("sqlalchemy.dialects.mysql.types", "SMALLINT(unsigned=True)").
+    Raises ValueError for types whose repr isn't a call with literal arguments, so such schemas just aren't snapshotted.
+'''
+def _type_to_json(type_):
+    spec = {"module": type(type_).__module__, "repr": repr(type_)}
+    _type_from_json(spec)
+    return spec
+
+''' Rebuild a column type: only SQLAlchemy type classes, called with literal arguments parsed out of the repr '''
+def _type_from_json(spec):
+    call = ast.parse(spec["repr"], mode="eval").body
+    if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Name)) or not spec["module"].startswith("sqlalchemy."):
+        raise ValueError(f"unsupported column type {spec['repr']}")
+    cls = getattr(importlib.import_module(spec["module"]), call.func.id, None)
+    if not (isinstance(cls, type) and issubclass(cls, sqlalchemy.types.TypeEngine)):
+        raise ValueError(f"unsupported column type {spec['repr']}")
+    args = [ast.literal_eval(arg) for arg in call.args]
+    kwargs = {keyword.arg: ast.literal_eval(keyword.value) for keyword in call.keywords}
+    return cls(*args, **kwargs)
+
+def _table_to_json(table):
+    return {
+        "name": table.name,
+        "columns": [
+            {
+                "name": column.name,
+                "type": _type_to_json(column.type),
+                "nullable": column.nullable,
+                "primary_key": column.primary_key,
+                "autoincrement": column.autoincrement,
+                "server_default": str(column.server_default.arg) if column.server_default is not None else None,
+            }
+            for column in table.columns
+        ],
+        "foreign_keys": [
+            {
+                "name": fk.name,
+                "columns": [column.name for column in fk.columns],
+                "references": [element.target_fullname for element in fk.elements],
+                "ondelete": fk.ondelete,
+                "onupdate": fk.onupdate,
+            }
+            for fk in sorted(table.foreign_key_constraints, key=lambda fk: [column.name for column in fk.columns])
+        ],
+        "indexes": [
+            {"name": index.name, "columns": [column.name for column in index.columns], "unique": index.unique}
+            for index in sorted(table.indexes, key=lambda index: index.name or "")
+        ],
+    }
+
+def _table_from_json(metadata, spec):
+    columns = [
+        sqlalchemy.Column(
+            column["name"], _type_from_json(column["type"]),
+            nullable=column["nullable"], primary_key=column["primary_key"], autoincrement=column["autoincrement"],
+            server_default=text(column["server_default"]) if column["server_default"] is not None else None,
+        )
+        for column in spec["columns"]
+    ]
+    foreign_keys = [
+        sqlalchemy.ForeignKeyConstraint(fk["columns"], fk["references"], name=fk["name"], ondelete=fk["ondelete"], onupdate=fk["onupdate"])
+        for fk in spec["foreign_keys"]
+    ]
+    table = sqlalchemy.Table(spec["name"], metadata, *columns, *foreign_keys)
+    for index in spec["indexes"]:
+        sqlalchemy.Index(index["name"], *(table.c[name] for name in index["columns"]), unique=index["unique"])
+    return table
@@ -0,0 +1,283 @@
+import re
+import threading
+import click
+from flask import current_app
+from sqlalchemy import and_, case, column, false, func, literal, literal_column, or_, select, table, text
+from sqlalchemy.dialects import mysql
+from .db import get_session, models
+
+# Highlighted matches are wrapped in these markers
+MARK_OPEN, MARK_CLOSE = "<mark>", "</mark>"
+
+# Words of description kept around the first match in a snippet
+SNIPPET_WORDS = 16
+
+# FTS5 bm25() column weights (title, description): a title hit outranks a description hit
+FTS5_COLUMN_WEIGHTS = (4.0, 1.0)
+
+# Score per matched word in the ilike fallback
+LIKE_TITLE_SCORE, LIKE_DESCRIPTION_SCORE = 2, 1
+
+FTS5_TABLE = "film_text_fts"
+MYSQL_INDEX = "idx_title_description"
+
+_WORD = re.compile(r'([+-]?)("[^"]*"|[^\s"]+)')
+
+
+class FullTextQuery:
+    '''
+        A search term split into words. In natural mode every word is optional;
+        in boolean mode words follow MySQL's syntax: +required, -excluded, word* prefix, "quoted phrase".
+    '''
+
+    def __init__(self, term: str, mode: str = "natural"):
+        self.term = term
+        self.mode = mode
+        self.required, self.excluded, self.optional = [], [], []
+        for op, word in _WORD.findall(term):
+            prefix = word.endswith("*") and not word.startswith('"')
+            word = word.strip('"').rstrip("*").strip()
+            if not word:
+                continue
+            if mode != "boolean" or not op:
+                self.optional.append((word, prefix))
+            elif op == "+":
+                self.required.append((word, prefix))
+            else:
+                self.excluded.append((word, prefix))
+
+    ''' The words a matching film must contain (any of them when none is required) '''
+    @property
+    def positive(self):
+        return self.required or self.optional
+
+    ''' Every searched-for word, for highlighting '''
+    @property
+    def words(self):
+        return [word for word, prefix in self.required + self.optional]
+
+
+class FullTextBackend:
+    ''' One way of matching film_text; matches() returns a SELECT of film_id, score, title, description '''
+    name = None
+    # Whether matches() returns title/description already highlighted
+    highlights = False
+
+    def detect(self, session):
+        raise NotImplementedError
+
+    def create(self, session):
+        raise NotImplementedError
+
+    def matches(self, query: FullTextQuery):
+        raise NotImplementedError
+
+
+class MySQLFullText(FullTextBackend):
+    ''' MATCH (title, description) AGAINST (...) over Sakila's FULLTEXT index on film_text '''
+    name = "mysql"
+
+    def detect(self, session):
+        rows = session.execute(text(
+            "SELECT index_name, column_name FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'film_text' AND index_type = 'FULLTEXT'"
+        ))
+        columns = {}
+        for index_name, column_name in rows:
+            columns.setdefault(index_name, set()).add(column_name.lower())
+        return {"title", "description"} in columns.values()
+
+    def create(self, session):
+        session.execute(text(f"ALTER TABLE film_text ADD FULLTEXT INDEX {MYSQL_INDEX} (title, description)"))
+
+    def matches(self, query: FullTextQuery):
+        film_text = models["film_text"]
+        if query.mode == "boolean":
+            relevance = mysql.match(film_text.title, film_text.description, against=query.term).in_boolean_mode()
+        else:
+            relevance = mysql.match(film_text.title, film_text.description, against=query.term).in_natural_language_mode()
+        return (
+            select(film_text.film_id.label("film_id"), relevance.label("score"), film_text.title, film_text.description)
+            .where(relevance > 0)
+        )
+
+
+class SQLiteFTS5(FullTextBackend):
+    ''' An external-content FTS5 table over film_text, kept in sync by triggers; ranked by bm25 '''
+    name = "fts5"
+    highlights = True
+
+    def detect(self, session):
+        return session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS5_TABLE}
+        ).first() is not None
+
+    def create(self, session):
+        session.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS5_TABLE} "
+            "USING fts5(title, description, content='film_text', content_rowid='film_id')"
+        ))
+        session.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS5_TABLE}_ai AFTER INSERT ON film_text BEGIN "
+            f"INSERT INTO {FTS5_TABLE} (rowid, title, description) VALUES (new.film_id, new.title, new.description); END"
+        ))
+        session.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS5_TABLE}_ad AFTER DELETE ON film_text BEGIN "
+            f"INSERT INTO {FTS5_TABLE} ({FTS5_TABLE}, rowid, title, description) VALUES ('delete', old.film_id, old.title, old.description); END"
+        ))
+        session.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS5_TABLE}_au AFTER UPDATE ON film_text BEGIN "
+            f"INSERT INTO {FTS5_TABLE} ({FTS5_TABLE}, rowid, title, description) VALUES ('delete', old.film_id, old.title, old.description); "
+            f"INSERT INTO {FTS5_TABLE} (rowid, title, description) VALUES (new.film_id, new.title, new.description); END"
+        ))
+        session.execute(text(f"INSERT INTO {FTS5_TABLE} ({FTS5_TABLE}) VALUES ('rebuild')"))
+
+    ''' The query as an FTS5 expression, or None when it has nothing to match '''
+    def expression(self, query: FullTextQuery):
+        def quote(word, prefix):
+            return '"' + word.replace('"', '""') + '"' + ("*" if prefix else "")
+
+        if not query.positive:
+            return None
+        joiner = " AND " if query.required else " OR "
+        expr = "(" + joiner.join(quote(*w) for w in query.positive) + ")"
+        for w in query.excluded:
+            expr += " NOT " + quote(*w)
+        return expr
+
+    def matches(self, query: FullTextQuery):
+        fts = table(FTS5_TABLE, column("rowid"))
+        fts_ref = literal_column(FTS5_TABLE)
+        return (
+            select(
+                fts.c.rowid.label("film_id"),
+                (-func.bm25(fts_ref, *FTS5_COLUMN_WEIGHTS)).label("score"),
+                func.highlight(fts_ref, 0, MARK_OPEN, MARK_CLOSE).label("title"),
+                func.snippet(fts_ref, 1, MARK_OPEN, MARK_CLOSE, "…", SNIPPET_WORDS).label("description"),
+            )
+            .where(fts_ref.op("MATCH")(self.expression(query)))
+        )
+
+
+class LikeFallback(FullTextBackend):
+    ''' ilike over film_text, for databases without a full-text index; scores count the matched words '''
+    name = "like"
+
+    def detect(self, session):
+        return True
+
+    def create(self, session):
+        pass
+
+    def matches(self, query: FullTextQuery):
+        film_text = models["film_text"]
+
+        def hit(word):
+            return or_(
+                film_text.title.icontains(word, autoescape=True),
+                film_text.description.icontains(word, autoescape=True)
+            )
+
+        score = sum(
+            case((film_text.title.icontains(word, autoescape=True), LIKE_TITLE_SCORE), else_=0)
+            + case((film_text.description.icontains(word, autoescape=True), LIKE_DESCRIPTION_SCORE), else_=0)
+            for word, prefix in query.positive
+        ) if query.positive else literal(0)
+
+        conditions = [hit(word) for word, prefix in query.required]
+        if not query.required:
+            conditions.append(or_(*[hit(word) for word, prefix in query.optional]) if query.optional else false())
+        conditions += [~hit(word) for word, prefix in query.excluded]
+        return (
+            select(film_text.film_id.label("film_id"), score.label("score"), film_text.title, film_text.description)
+            .where(and_(*conditions))
+        )
+
+
+BACKENDS = {"mysql": MySQLFullText, "fts5": SQLiteFTS5, "like": LikeFallback}
+
+''' The native backend for a SQLAlchemy dialect name, if it has one '''
+def _native_backend(dialect: str):
+    return {"mysql": MySQLFullText, "mariadb": MySQLFullText, "sqlite": SQLiteFTS5}.get(dialect)
+
+
+class FullText:
+    '''
+        Picks the full-text backend for film search: the configured one, or with "auto" the database's native
+        index when it exists, otherwise the ilike fallback. Detection runs once per process, on first use.
+    '''
+
+    def __init__(self):
+        self.setting = "auto"
+        self._backend = None
+        self._lock = threading.Lock()
+
+    def configure(self, setting: str):
+        if setting not in ("auto", *BACKENDS):
+            raise ValueError(f"Unknown FULLTEXT_BACKEND {setting!r}")
+        self.setting = setting
+        self.reset()
+
+    def reset(self):
+        self._backend = None
+
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = self._choose(get_session())
+        return self._backend
+
+    def _choose(self, session):
+        if self.setting != "auto":
+            return BACKENDS[self.setting]()
+        native = _native_backend(session.get_bind().dialect.name)
+        if native is not None:
+            try:
+                if native().detect(session):
+                    return native()
+            except Exception as e:
+                session.rollback()
+                current_app.logger.warning(f"Full-text index detection failed: {str(e)}")
+        return LikeFallback()
+
+
+fulltext = FullText()
+
+''' Wrap each occurrence of the words in text with the highlight markers '''
+def highlight(value: str, words):
+    if not value or not words:
+        return value
+    pattern = re.compile("|".join(re.escape(w) for w in sorted(words, key=len, reverse=True)), re.IGNORECASE)
+    return pattern.sub(lambda m: f"{MARK_OPEN}{m.group(0)}{MARK_CLOSE}", value)
+
+''' About SNIPPET_WORDS words of text around the first matched word, highlighted, with … where it was cut '''
+def snippet(value: str, words, size: int = SNIPPET_WORDS):
+    if not value:
+        return value
+    tokens = value.split()
+    lowered = [w.lower() for w in words]
+    first = next((i for i, token in enumerate(tokens) if any(w in token.lower() for w in lowered)), 0)
+    start = max(0, min(first - size // 2, len(tokens) - size))
+    end = start + size
+    cut = " ".join(tokens[start:end])
+    return ("…" if start > 0 else "") + highlight(cut, words) + ("…" if end < len(tokens) else "")
+
+def init_fulltext(app):
+    fulltext.configure(app.config.get("FULLTEXT_BACKEND", "auto"))
+
+    @app.cli.command("fulltext-index")
+    def fulltext_index():
+        ''' Create the database's native full-text index on film_text (FULLTEXT on MySQL, FTS5 on SQLite) '''
+        session = get_session()
+        native = _native_backend(session.get_bind().dialect.name)
+        if native is None:
+            raise click.ClickException(f"No full-text index support for {session.get_bind().dialect.name}")
+        backend = native()
+        if backend.detect(session):
+            click.echo(f"{backend.name} index already exists")
+            return
+        backend.create(session)
+        session.commit()
+        fulltext.reset()
+        click.echo(f"Created {backend.name} index on film_text")
@@ -0,0 +1,96 @@
+import codecs
+import csv
+import json
+import click
+
+FORMATS = ("csv", "ndjson")
+
+
+class InputError(ValueError):
+    ''' The input itself can't be read any further (bad encoding, malformed CSV); the import stops at this point '''
+
+
+'''
+    Rows of a CSV (with a header row) or NDJSON byte stream as dicts, read line by line so the whole file is never in memory.
+    An NDJSON line that isn't valid UTF-8 or JSON is yielded as a ValueError, so it is reported against its row like any
+    other bad row. CSV records can span lines, so there an undecodable line or a csv.Error yields an InputError and ends the rows.
+'''
+def read_rows(stream, fmt: str):
+    lines = _decoded_lines(stream)
+    if fmt == "csv":
+        undecodable = []
+
+        def csv_lines():
+            for line in lines:
+                if isinstance(line, ValueError):
+                    undecodable.append(line)
+                    return
+                yield line
+
+        reader = csv.DictReader(csv_lines())
+        try:
+            yield from reader
+        except csv.Error as e:
+            if not undecodable:
+                yield InputError(f"Malformed CSV at line {reader.line_num}: {str(e)}; import stopped there")
+                return
+        if undecodable:
+            yield InputError(f"Line {undecodable[0].line_number} is not valid UTF-8; import stopped there")
+        return
+    for line in lines:
+        if isinstance(line, ValueError):
+            yield line
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"Invalid JSON: {str(e)}")
+
+''' Each line of a byte stream decoded as UTF-8 (a leading BOM dropped); a line that doesn't decode comes out as a ValueError '''
+def _decoded_lines(stream):
+    for line_number, raw in enumerate(iter(stream.readline, b""), start=1):
+        if line_number == 1 and raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8):]
+        try:
+            yield raw.decode("utf-8")
+        except UnicodeDecodeError:
+            error = ValueError("Row is not valid UTF-8")
+            error.line_number = line_number
+            yield error
+
+''' The format named by ?format= or, failing that, the Content-Type / file extension '''
+def detect_format(explicit: str = None, hint: str = ""):
+    if explicit:
+        return explicit if explicit in FORMATS else None
+    return "csv" if "csv" in (hint or "").lower() else "ndjson"
+
+def init_imports(app):
+    @app.cli.command("import-customers")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "fmt", type=click.Choice(FORMATS), help="Input format (default: from the file extension)")
+    @click.option("--batch-size", type=click.IntRange(min=1), help="Rows per transaction")
+    def import_customers(path, fmt, batch_size):
+        ''' Bulk-import customers from a CSV or NDJSON file '''
+        from .services import import_service
+
+        if batch_size and batch_size > import_service.MAX_IMPORT_BATCH_SIZE:
+            raise click.BadParameter(f"at most {import_service.MAX_IMPORT_BATCH_SIZE}", param_hint="--batch-size")
+        with open(path, "rb") as f:
+            result, status_code = import_service.import_customers(
+                read_rows(f, detect_format(fmt, path)),
+                batch_size or import_service.IMPORT_BATCH_SIZE
+            )
+        for error in result["errors"]:
+            click.echo(f"row {error['row']}: {'; '.join(error['errors'])}", err=True)
+        if result["errors_truncated"]:
+            click.echo(f"... {result['failed'] - len(result['errors'])} more failed rows", err=True)
+        if result["stopped"]:
+            click.echo(result["stopped"], err=True)
+        click.echo(
+            f"Imported {result['imported']} of {result['rows']} rows ({result['failed']} failed) "
+            f"in {result['seconds']}s, {result['rows_per_second']} rows/s"
+        )
+        if status_code == 400:
+            raise SystemExit(1)
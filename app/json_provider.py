@@ -0,0 +1,53 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder below produces the same output, just slower
+    orjson = None
+
+''' Encode the types Sakila rows carry: DATETIME/DATE/TIME as ISO 8601, DECIMAL as a number, SET columns as lists '''
+def _default(obj):
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+''' Serialize to UTF-8 bytes with sorted keys; shared by the Flask provider and the ASGI responses '''
+def dumps_bytes(obj, indent=False):
+    if orjson is not None:
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    if indent:
+        return json.dumps(obj, default=_default, sort_keys=True, indent=2).encode()
+    return json.dumps(obj, default=_default, sort_keys=True, separators=(",", ":")).encode()
+
+class FastJSONProvider(DefaultJSONProvider):
+    '''
+        JSON provider backed by orjson when installed.
+        Services can hand datetime and Decimal values straight to jsonify instead of pre-converting every field.
+        Keys stay sorted and debug responses stay indented, matching Flask's default output.
+    '''
+
+    def _dumps_bytes(self, obj, indent=False):
+        return dumps_bytes(obj, indent)
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps_bytes(obj, indent=bool(kwargs.get("indent"))).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._dumps_bytes(obj, indent) + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,336 @@
+import heapq
+import threading
+from sqlalchemy import func
+from .db import get_session, models
+from .polling import PolledCache, probe_table
+
+# How many entries each leaderboard keeps ready to serve
+LEADERBOARD_SIZE = 10
+
+# Default number of films kept per actor (overridden by ACTOR_TOP_FILMS_SIZE)
+ACTOR_TOP_FILMS_SIZE = 20
+
+# Rental ids below the highest seen that each poll scans again, for rentals whose transactions committed out of id order
+RESCAN_WINDOW = 1000
+
+class TopK:
+    '''
+        The k best keys under sort_key (smallest first), kept current while scores only grow.
+        A bumped key can only move up, so it is enough to re-sort the k current entries plus that key.
+    '''
+
+    def __init__(self, k: int, sort_key):
+        self.k = k
+        self.sort_key = sort_key
+        self.items = []
+
+    def rebuild(self, keys):
+        self.items = heapq.nsmallest(self.k, keys, key=self.sort_key)
+
+    def bumped(self, key):
+        items = self.items
+        if key not in items:
+            if len(items) >= self.k and self.sort_key(key) >= self.sort_key(items[-1]):
+                return
+            items.append(key)
+        items.sort(key=self.sort_key)
+        del items[self.k:]
+
+
+class _LeaderboardState:
+    ''' Counts behind the homepage leaderboards and the per-actor top films '''
+
+    def __init__(self, actor_films_size: int = ACTOR_TOP_FILMS_SIZE):
+        self.film_titles = {}     # film_id -> title
+        self.film_rentals = {}    # film_id -> number of rentals
+        self.film_stock = {}      # film_id -> number of inventory copies
+        self.film_cast = {}       # film_id -> [actor_id]
+        self.actor_names = {}     # actor_id -> (first_name, last_name)
+        self.actor_stocked = {}   # actor_id -> number of distinct films with at least one copy in stock
+        self.top_films = TopK(LEADERBOARD_SIZE, self.film_rank)
+        self.actor_films_size = actor_films_size
+        self.actor_top_films = {}  # actor_id -> TopK of that actor's most rented film ids
+        self.top_actors = TopK(LEADERBOARD_SIZE, lambda aid: (
+            -self.actor_stocked.get(aid, 0), self.actor_names[aid][1], self.actor_names[aid][0], aid
+        ))
+        self.max_rental_id = 0
+        self.max_inventory_id = 0
+        self.rental_count = 0          # rentals counted so far, however they arrived
+        self.counted_rentals = set()   # counted rental ids above rescan_floor, so a rescan or record_rental() never counts one twice
+        self.probes = {}               # table -> (count, max(last_update)) when last loaded
+
+    @property
+    def rescan_floor(self):
+        return self.max_rental_id - RESCAN_WINDOW
+
+    def film_rank(self, film_id):
+        return (-self.film_rentals.get(film_id, 0), film_id)
+
+    def add_rental(self, film_id):
+        self.rental_count += 1
+        self.film_rentals[film_id] = self.film_rentals.get(film_id, 0) + 1
+        self.top_films.bumped(film_id)
+        for aid in self.film_cast.get(film_id, ()):
+            top = self.actor_top_films.get(aid)
+            if top is None:
+                top = self.actor_top_films[aid] = TopK(self.actor_films_size, self.film_rank)
+            top.bumped(film_id)
+
+    def rank_actor_films(self):
+        films_by_actor = {}
+        for fid in self.film_rentals:
+            for aid in self.film_cast.get(fid, ()):
+                films_by_actor.setdefault(aid, []).append(fid)
+        self.actor_top_films = {}
+        for aid, film_ids in films_by_actor.items():
+            top = self.actor_top_films[aid] = TopK(self.actor_films_size, self.film_rank)
+            top.rebuild(film_ids)
+
+    def add_copy(self, film_id):
+        self.film_stock[film_id] = self.film_stock.get(film_id, 0) + 1
+        if self.film_stock[film_id] == 1:
+            for aid in self.film_cast.get(film_id, ()):
+                if aid in self.actor_names:
+                    self.actor_stocked[aid] = self.actor_stocked.get(aid, 0) + 1
+                    self.top_actors.bumped(aid)
+
+    def recount_actors(self):
+        self.actor_stocked = {}
+        for fid, cast in self.film_cast.items():
+            if self.film_stock.get(fid):
+                for aid in cast:
+                    if aid in self.actor_names:
+                        self.actor_stocked[aid] = self.actor_stocked.get(aid, 0) + 1
+        self.top_actors.rebuild(list(self.actor_stocked))
+
+    def films(self, n: int, top: TopK = None):
+        top = top or self.top_films
+        return [
+            {"film_id": fid, "title": self.film_titles.get(fid), "rentals": self.film_rentals[fid]}
+            for fid in top.items[:n]
+        ]
+
+    def actor_films(self, actor_id: int, n: int):
+        top = self.actor_top_films.get(actor_id)
+        return self.films(n, top) if top else []
+
+    def actors(self, n: int):
+        return [
+            {
+                "actor_id": aid,
+                "first_name": f"{self.actor_names[aid][0]}",
+                "last_name": f"{self.actor_names[aid][1]}",
+                "films_in_store": self.actor_stocked[aid]
+            }
+            for aid in self.top_actors.items[:n]
+        ]
+
+
+''' Tables whose changes (other than new rental/inventory rows) force the catalog side to reload '''
+CATALOG_TABLES = ("film", "actor", "film_actor", "inventory")
+
+
+class Leaderboards(PolledCache):
+    '''
+        Top rented films, top actors by films in store and each actor's most rented films,
+        computed once and then maintained incrementally.
+        New rentals arrive through record_rental() from this process and through a delta scan on rental_id for other workers.
+        check_consistency() compares against a full recompute and repairs any drift; it has to run inside the worker
+        whose leaderboards it checks, so it is exposed as POST /api/admin/leaderboards/check.
+    '''
+    name = "Leaderboards"
+
+    def __init__(self):
+        super().__init__()
+        self._state = None
+        self._lock = threading.RLock()
+        self.actor_films_size = ACTOR_TOP_FILMS_SIZE
+
+    @property
+    def ready(self):
+        return self._state is not None
+
+    ''' Compute every count from scratch into a new state '''
+    def _compute(self):
+        session = get_session()
+        film, actor, film_actor, inventory, rental = models["film"], models["actor"], models["film_actor"], models["inventory"], models["rental"]
+
+        state = _LeaderboardState(self.actor_films_size)
+        state.probes = {table: probe_table(session, table) for table in CATALOG_TABLES}
+        state.max_rental_id = session.query(func.max(rental.rental_id)).scalar() or 0
+        state.max_inventory_id = session.query(func.max(inventory.inventory_id)).scalar() or 0
+
+        state.film_titles = dict(session.query(film.film_id, film.title))
+        state.actor_names = {aid: (fn, ln) for aid, fn, ln in session.query(actor.actor_id, actor.first_name, actor.last_name)}
+        for aid, fid in session.query(film_actor.actor_id, film_actor.film_id):
+            state.film_cast.setdefault(fid, []).append(aid)
+        state.film_stock = dict(
+            session.query(inventory.film_id, func.count(inventory.inventory_id))
+            .filter(inventory.inventory_id <= state.max_inventory_id)
+            .group_by(inventory.film_id)
+        )
+        state.film_rentals = dict(
+            session.query(inventory.film_id, func.count(rental.rental_id))
+            .join(rental, rental.inventory_id == inventory.inventory_id)
+            .filter(rental.rental_id <= state.max_rental_id)
+            .group_by(inventory.film_id)
+        )
+        state.counted_rentals = {
+            rid for rid, in session.query(rental.rental_id)
+            .filter(rental.rental_id > state.rescan_floor, rental.rental_id <= state.max_rental_id)
+        }
+
+        state.rental_count = sum(state.film_rentals.values())
+        state.top_films.rebuild(list(state.film_rentals))
+        state.rank_actor_films()
+        state.recount_actors()
+        return state
+
+    def rebuild(self):
+        state = self._compute()
+        with self._lock:
+            self._state = state
+            self.mark_refreshed()
+
+    '''
+        Pick up rentals and inventory copies created by any worker since the last poll.
+        Rentals are scanned from RESCAN_WINDOW ids below the highest seen, because a transaction that took a lower id
+        can commit after a higher one was already picked up; counted_rentals keeps those rescans from double counting.
+    '''
+    def refresh(self):
+        state = self._state
+        if state is None:
+            return self.rebuild()
+
+        session = get_session()
+        probes = {table: probe_table(session, table) for table in CATALOG_TABLES}
+
+        # Catalog edits or deleted copies are rare; recompute rather than track them row by row
+        inventory_grew_only = probes["inventory"][0] >= state.probes["inventory"][0]
+        if any(probes[t] != state.probes[t] for t in ("film", "actor", "film_actor")) or not inventory_grew_only:
+            return self.rebuild()
+
+        rental, inventory = models["rental"], models["inventory"]
+        new_rentals = (
+            session.query(rental.rental_id, inventory.film_id)
+            .join(inventory, inventory.inventory_id == rental.inventory_id)
+            .filter(rental.rental_id > state.rescan_floor)
+            .order_by(rental.rental_id)
+        ).all()
+        new_copies = (
+            session.query(inventory.inventory_id, inventory.film_id)
+            .filter(inventory.inventory_id > state.max_inventory_id)
+            .order_by(inventory.inventory_id)
+        ).all()
+
+        with self._lock:
+            for rental_id, film_id in new_rentals:
+                if rental_id <= state.rescan_floor or rental_id in state.counted_rentals:
+                    continue
+                state.counted_rentals.add(rental_id)
+                state.add_rental(film_id)
+            if new_rentals:
+                state.max_rental_id = max(state.max_rental_id, new_rentals[-1][0])
+            state.counted_rentals = {rid for rid in state.counted_rentals if rid > state.rescan_floor}
+
+            for inventory_id, film_id in new_copies:
+                state.add_copy(film_id)
+            if new_copies:
+                state.max_inventory_id = new_copies[-1][0]
+            state.probes["inventory"] = probes["inventory"]
+            self.mark_refreshed()
+
+    ''' Count a rental committed by this process right away; the delta scan will skip it '''
+    def record_rental(self, rental_id: int, film_id: int):
+        state = self._state
+        if state is None:
+            return
+        with self._lock:
+            if rental_id <= state.rescan_floor or rental_id in state.counted_rentals:
+                return
+            state.counted_rentals.add(rental_id)
+            state.add_rental(film_id)
+
+    '''
+        The data the leaderboards currently serve, as a comparable value (None when unavailable).
+        Two workers that have applied the same rentals, copies and catalog report the same version.
+    '''
+    def version(self):
+        if not self.enabled:
+            return None
+        self.maybe_refresh()
+        if not self.ready:
+            return None
+        with self._lock:
+            state = self._state
+            return (state.max_rental_id, state.rental_count, state.max_inventory_id, tuple(sorted(state.probes.items())))
+
+    ''' Top n films by rentals, or None when the leaderboards are unavailable '''
+    def top_films(self, n: int = 5):
+        if not self.enabled or n > LEADERBOARD_SIZE:
+            return None
+        self.maybe_refresh()
+        if not self.ready:
+            return None
+        with self._lock:
+            return self._state.films(n)
+
+    ''' Top n actors by distinct films in store, or None when the leaderboards are unavailable '''
+    def top_actors(self, n: int = 5):
+        if not self.enabled or n > LEADERBOARD_SIZE:
+            return None
+        self.maybe_refresh()
+        if not self.ready:
+            return None
+        with self._lock:
+            return self._state.actors(n)
+
+    ''' An actor's n most rented films, or None when unavailable or n exceeds what is kept per actor '''
+    def actor_top_films(self, actor_id: int, n: int = 5):
+        if not self.enabled or n > self.actor_films_size:
+            return None
+        self.maybe_refresh()
+        if not self.ready:
+            return None
+        with self._lock:
+            return self._state.actor_films(actor_id, n)
+
+    '''
+        Recompute everything and compare with the maintained leaderboards.
+        Returns the entries that differed (empty when consistent); the recomputed state replaces the old one.
+    '''
+    def check_consistency(self):
+        with self._refresh_lock:
+            self.refresh()
+            expected = self._compute()
+            with self._lock:
+                current = self._state
+                mismatches = {}
+                if current.films(LEADERBOARD_SIZE) != expected.films(LEADERBOARD_SIZE):
+                    mismatches["films"] = {"maintained": current.films(LEADERBOARD_SIZE), "recomputed": expected.films(LEADERBOARD_SIZE)}
+                if current.actors(LEADERBOARD_SIZE) != expected.actors(LEADERBOARD_SIZE):
+                    mismatches["actors"] = {"maintained": current.actors(LEADERBOARD_SIZE), "recomputed": expected.actors(LEADERBOARD_SIZE)}
+                for aid in set(current.actor_top_films) | set(expected.actor_top_films):
+                    maintained = current.actor_films(aid, self.actor_films_size)
+                    recomputed = expected.actor_films(aid, self.actor_films_size)
+                    if maintained != recomputed:
+                        mismatches[f"actor {aid} films"] = {"maintained": maintained, "recomputed": recomputed}
+                self._state = expected
+                self.mark_refreshed()
+        return mismatches
+
+
+leaderboards = Leaderboards()
+
+def init_leaderboards(app):
+    if not app.config.get("LEADERBOARD_ENABLED"):
+        return
+    leaderboards.enabled = True
+    leaderboards.refresh_seconds = app.config["LEADERBOARD_REFRESH_SECONDS"]
+    leaderboards.actor_films_size = app.config["ACTOR_TOP_FILMS_SIZE"]
+    with app.app_context():
+        try:
+            leaderboards.rebuild()
+        except Exception as e:
+            # The top-5 endpoints aggregate in SQL until a rebuild succeeds
+            app.logger.warning(f"Leaderboard build failed: {str(e)}")
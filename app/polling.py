@@ -0,0 +1,45 @@
+import threading
+import time
+from flask import current_app
+from sqlalchemy import func
+from .db import models
+
+class PolledCache:
+    '''
+        Base for process-local caches that re-sync with the database by polling.
+        Subclasses implement refresh(); maybe_refresh() runs it at most every refresh_seconds, on one thread at a time.
+    '''
+    name = "cache"
+
+    def __init__(self):
+        self._refresh_lock = threading.Lock()
+        self._last_refresh = 0.0
+        self.enabled = False
+        self.refresh_seconds = 30
+
+    def refresh(self):
+        raise NotImplementedError
+
+    def mark_refreshed(self):
+        self._last_refresh = time.monotonic()
+
+    ''' Refresh if the polling interval has elapsed; other threads keep serving the current data meanwhile '''
+    def maybe_refresh(self):
+        if time.monotonic() - self._last_refresh < self.refresh_seconds:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            # Keep serving the previous data; the next poll will try again
+            self.mark_refreshed()
+            current_app.logger.warning(f"{self.name} refresh failed: {str(e)}")
+        finally:
+            self._refresh_lock.release()
+
+''' Cheap change probe for a table: (row count, max(last_update)) '''
+def probe_table(session, table: str):
+    t = models[table]
+    count, latest = session.query(func.count(), func.max(t.last_update)).select_from(t).one()
+    return count, latest
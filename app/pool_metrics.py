@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import deque
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Recent checkout waits kept for percentiles
+WAIT_SAMPLES = 1000
+
+class PoolStats:
+    ''' Counters fed by pool events; read through snapshot() '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+        self.connected_at = {}  # id(dbapi connection) -> time.monotonic() when opened
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.waits.append(seconds)
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+            self.connected_at[id(dbapi_connection)] = time.monotonic()
+
+    def on_close(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.closes += 1
+            self.connected_at.pop(id(dbapi_connection), None)
+
+    def on_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+
+    ''' Pre-ping failures, disconnect errors and explicit invalidation all land here '''
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self):
+        with self._lock:
+            waits = sorted(self.waits)
+            now = time.monotonic()
+            ages = [now - opened for opened in self.connected_at.values()]
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "closes": self.closes,
+                "invalidations": self.invalidations,
+                "checkout_wait_ms": {
+                    "avg": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                    "p50": round(_percentile(waits, 0.50) * 1000, 3),
+                    "p95": round(_percentile(waits, 0.95) * 1000, 3),
+                    "p99": round(_percentile(waits, 0.99) * 1000, 3),
+                    "max": round(self.wait_max * 1000, 3),
+                },
+                "connection_age_s": {
+                    "min": round(min(ages), 1) if ages else None,
+                    "avg": round(sum(ages) / len(ages), 1) if ages else None,
+                    "max": round(max(ages), 1) if ages else None,
+                },
+            }
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class InstrumentedQueuePool(QueuePool):
+    ''' QueuePool that records how long checkouts wait and feeds pool events into a PoolStats '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        event.listen(self, "connect", self.stats.on_connect)
+        event.listen(self, "close", self.stats.on_close)
+        event.listen(self, "checkout", self.stats.on_checkout)
+        event.listen(self, "checkin", self.stats.on_checkin)
+        event.listen(self, "invalidate", self.stats.on_invalidate)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.stats.on_timeout()
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - started)
+
+'''
+    Live pool state plus accumulated stats for an engine; recycle and pre-ping are the configured values under options_key
+    (SQLALCHEMY_REPLICA_ENGINE_OPTIONS for replicas, see config._engine_options)
+'''
+def pool_status(engine, options_key: str = "SQLALCHEMY_ENGINE_OPTIONS"):
+    pool = engine.pool
+    options = current_app.config.get(options_key, {})
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "timeout_s": pool.timeout(),
+            "recycle_s": options.get("pool_recycle", -1),
+            # With pre-ping on, failed pings are counted under "invalidations"
+            "pre_ping": options.get("pool_pre_ping", False),
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update(pool.stats.snapshot())
+    return status
+
+''' Swap in the instrumented pool before the primary and replica engines are created (call before init_db) '''
+def init_pool_metrics(app):
+    if not app.config.get("POOL_METRICS_ENABLED"):
+        return
+    for key in ("SQLALCHEMY_ENGINE_OPTIONS", "SQLALCHEMY_REPLICA_ENGINE_OPTIONS"):
+        options = dict(app.config.get(key, {}))
+        options.setdefault("poolclass", InstrumentedQueuePool)
+        app.config[key] = options
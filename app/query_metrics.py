@@ -0,0 +1,120 @@
+import heapq
+import re
+import time
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Slowest statements kept per request
+SLOWEST_KEPT = 3
+
+# Literals and expanded IN lists collapse so repeats of one statement share a fingerprint
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+# Statements are cut to this many characters in logs
+LOGGED_STATEMENT_CHARS = 300
+
+''' Normalized statement text used to spot the same query issued over and over (N+1) '''
+def fingerprint(statement: str):
+    statement = _LITERALS.sub("?", statement)
+    statement = _IN_LISTS.sub("(?)", statement)
+    return _SPACES.sub(" ", statement).strip()
+
+def _shorten(statement: str):
+    statement = _SPACES.sub(" ", statement).strip()
+    return statement if len(statement) <= LOGGED_STATEMENT_CHARS else statement[:LOGGED_STATEMENT_CHARS] + "..."
+
+
+class RequestQueryStats:
+    ''' Queries run while serving one request '''
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.slowest = []          # min-heap of (seconds, seq, statement), at most SLOWEST_KEPT
+        self.fingerprints = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.db_time += seconds
+        entry = (seconds, self.count, statement)
+        if len(self.slowest) < SLOWEST_KEPT:
+            heapq.heappush(self.slowest, entry)
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+        self.fingerprints[fingerprint(statement)] += 1
+
+    ''' Fingerprints issued at least threshold times, most repeated first '''
+    def repeated(self, threshold: int):
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n >= threshold]
+
+
+# The start time lives on the statement's execution context, so a statement that fails (and never reaches
+# after_cursor_execute) leaves nothing behind on the pooled connection
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and has_request_context():
+        context._query_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_start", None)
+    if started is None or not has_request_context():
+        return
+    elapsed = time.perf_counter() - started
+    stats = g.get("query_stats")
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+_listening = False
+
+'''
+    Per-request query count, DB time, slowest statements and N+1 fingerprints,
+    reported in a Server-Timing header and a slow-request log.
+    Nothing is registered when QUERY_METRICS_ENABLED is off, so the disabled cost is zero.
+'''
+def init_query_metrics(app):
+    global _listening
+    if not app.config.get("QUERY_METRICS_ENABLED"):
+        return
+
+    # Engine-class listeners cover the primary and any other engine the app opens
+    if not _listening:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _listening = True
+
+    slow_ms = app.config["SLOW_REQUEST_MS"]
+    repeat_threshold = app.config["N_PLUS_ONE_THRESHOLD"]
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = RequestQueryStats()
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.get("query_stats")
+        if stats is None:
+            return response
+        total_ms = (time.perf_counter() - g.request_started) * 1000
+        db_ms = stats.db_time * 1000
+        response.headers["Server-Timing"] = (
+            f'db;dur={db_ms:.1f};desc="{stats.count} queries", app;dur={total_ms:.1f}'
+        )
+
+        repeated = stats.repeated(repeat_threshold)
+        if repeated:
+            app.logger.warning(
+                f"Repeated queries on {request.method} {request.full_path.rstrip('?')}: "
+                + "; ".join(f"{n}x {_shorten(fp)}" for fp, n in repeated)
+            )
+        if total_ms >= slow_ms:
+            slowest = sorted(stats.slowest, reverse=True)
+            app.logger.warning(
+                f"Slow request {request.method} {request.full_path.rstrip('?')}: {total_ms:.1f} ms, "
+                f"{stats.count} queries, {db_ms:.1f} ms in DB; slowest: "
+                + "; ".join(f"{s * 1000:.1f} ms {_shorten(stmt)}" for s, _, stmt in slowest)
+            )
+        return response
@@ -1,13 +1,27 @@
-from flask import Blueprint, jsonify
-from ..services import actor_service
+from flask import Blueprint, jsonify, request
+from ..services import actor_service, version_service
+from .batch import batch_response, parse_ids
+from .conditional import conditional
 
 bp = Blueprint("actors", __name__)
 
+'''
+    GET /api/actors/batch?ids=1,2,3
+    Returns details for several actors keyed by id; unknown ids get a not-found entry.
+'''
+@bp.get("/batch")
+def actor_batch():
+    ids, error = parse_ids()
+    if error:
+        return error
+    return batch_response("actors", ids, actor_service.actors_by_id(ids), "Actor")
+
 '''
     GET /api/actors/<actor_id>
     Returns actor details.
 '''
 @bp.get("/<int:actor_id>")
+@conditional(version_service.actor_version)
 def get_actor(actor_id: int):
     data = actor_service.actor_detail(actor_id)
     if not data:
@@ -19,13 +33,16 @@ def get_actor(actor_id: int):
     Returns top 5 actors appearing in films
 '''
 @bp.get("/top5")
+@conditional(version_service.top_actors_version)
 def top_actors():
     return jsonify(actor_service.top_5_actors())
 
 '''
-    GET /api/actors/<actor_id>/top5films
-    Returns top 5 most rented films for an actor
+    GET /api/actors/<actor_id>/top5films?limit=<int>
+    Returns the most rented films for an actor (top 5 unless limit is given)
 '''
 @bp.get("/<int:actor_id>/top5films")
+@conditional(version_service.actor_top_films_version)
 def actor_top_films(actor_id: int):
-    return jsonify(actor_service.actor_top_5_rented_films(actor_id))
\ No newline at end of file
+    limit = max(1, min(request.args.get('limit', default=5, type=int), 100))
+    return jsonify(actor_service.actor_top_rented_films(actor_id, limit))
\ No newline at end of file
@@ -0,0 +1,62 @@
+import os
+from flask import Blueprint, jsonify, request
+from ..db import db, replicas
+from ..leaderboard import leaderboards
+from ..pool_metrics import pool_status
+from ..shared_cache import shared_cache
+from .auth import require_auth
+
+bp = Blueprint("admin", __name__)
+
+'''
+    GET /api/admin/pool
+    Connection pool sizing and live metrics for the primary and each read replica (requires authentication)
+'''
+@bp.get("/pool")
+@require_auth
+def pool(staff_id):
+    return jsonify({
+        "primary": pool_status(db.engine),
+        "replicas": [{**replica.status(), **pool_status(replica.engine, "SQLALCHEMY_REPLICA_ENGINE_OPTIONS")} for replica in replicas.replicas],
+    })
+
+'''
+    GET /api/admin/cache
+    Shared cache size and hit/miss statistics across all workers (requires authentication)
+'''
+@bp.get("/cache")
+@require_auth
+def cache_stats(staff_id):
+    if not shared_cache.enabled:
+        return {"error": "Shared cache is disabled"}, 404
+    stats = shared_cache.stats()
+    if stats is None:
+        return {"error": "Shared cache stats unavailable"}, 503
+    return jsonify(stats)
+
+'''
+    POST /api/admin/cache/invalidate
+    Drop shared cache entries by tag (requires authentication)
+    Payload: {"tags": [str]} e.g. {"tags": ["film:123"]}
+'''
+@bp.post("/cache/invalidate")
+@require_auth
+def invalidate_cache(staff_id):
+    data = request.get_json(silent=True) or {}
+    tags = data.get('tags')
+    if not isinstance(tags, list) or not tags or not all(isinstance(tag, str) for tag in tags):
+        return {"error": "tags must be a non-empty list of strings"}, 400
+    return jsonify({"invalidated": shared_cache.invalidate(*tags)})
+
+'''
+    POST /api/admin/leaderboards/check
+    Compare this worker's maintained leaderboards with a full recompute and repair any drift (requires authentication)
+    Each call checks only the worker that serves it; the response says which one (pid)
+'''
+@bp.post("/leaderboards/check")
+@require_auth
+def check_leaderboards(staff_id):
+    if not leaderboards.enabled or not leaderboards.ready:
+        return {"error": "Leaderboards are not available"}, 404
+    mismatches = leaderboards.check_consistency()
+    return jsonify({"pid": os.getpid(), "consistent": not mismatches, "mismatches": mismatches})
@@ -0,0 +1,26 @@
+from flask import jsonify, request
+
+# Most ids one batch request may ask for
+MAX_BATCH_IDS = 1000
+
+''' Parse ?ids=1,2,3 into a list of ints; returns (ids, None) or (None, error response) '''
+def parse_ids():
+    raw = request.args.get('ids', '')
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        return None, ({"error": "ids must be a comma-separated list of integers"}, 400)
+    if not ids:
+        return None, ({"error": "ids is required"}, 400)
+    if len(ids) > MAX_BATCH_IDS:
+        return None, ({"error": f"At most {MAX_BATCH_IDS} ids per request"}, 400)
+    return ids, None
+
+''' {key: {id: document, or an error entry for ids that weren't found}, "not_found": [ids]} '''
+def batch_response(key: str, ids, found: dict, label: str):
+    ids = list(dict.fromkeys(ids))
+    not_found = [i for i in ids if i not in found]
+    return jsonify({
+        key: {i: found[i] if i in found else {"error": f"{label} not found"} for i in ids},
+        "not_found": not_found
+    })
@@ -0,0 +1,70 @@
+import hashlib
+from datetime import timezone
+from zoneinfo import ZoneInfo
+from functools import wraps
+from flask import current_app, g, make_response, request
+
+# Bump when response formats change so clients don't keep bodies from the previous release
+ETAG_FORMAT = 1
+
+''' The weak ETag for a probed version of the resource at full_path ("path?query"); the ASGI routes use it too '''
+def resource_etag(full_path: str, version):
+    return hashlib.sha1(repr((ETAG_FORMAT, full_path, version)).encode()).hexdigest()
+
+'''
+    A probed last_update as a UTC datetime to the second, for Last-Modified.
+    Naive values are wall-clock times in DB_TIMEZONE (the server's local zone when unset), not UTC.
+'''
+def http_last_modified(last_modified):
+    if last_modified is None:
+        return None
+    if last_modified.tzinfo is None:
+        zone = current_app.config.get("DB_TIMEZONE")
+        last_modified = last_modified.replace(tzinfo=ZoneInfo(zone)) if zone else last_modified.astimezone()
+    return last_modified.replace(microsecond=0).astimezone(timezone.utc)
+
+'''
+    Answer conditional GETs from a cheap version probe before the view runs.
+    probe(**view_kwargs) returns (version, last_modified) or None; the weak ETag hashes the version with the
+    request path and query, and Last-Modified is the newest last_update behind the response.
+    A matching If-None-Match (or, without one, an unmodified If-Modified-Since) gets a 304 and the view is never called.
+    The probed version is left in g.resource_version so shared-cache lookups made by the view are keyed by it (see shared_cache.cached),
+    which keeps a body cached before the last change from being sent under the new ETag.
+'''
+def conditional(probe):
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_app.config.get("CONDITIONAL_GET_ENABLED"):
+                return f(*args, **kwargs)
+            
+            probed = probe(**kwargs)
+            if probed is None:
+                return f(*args, **kwargs)
+            
+            version, last_modified = probed
+            g.resource_version = version
+            etag = resource_etag(request.full_path, version)
+            last_modified = http_last_modified(last_modified)
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = (
+                    request.if_modified_since is not None and last_modified is not None
+                    and last_modified <= request.if_modified_since
+                )
+            
+            response = make_response("", 304) if not_modified else make_response(f(*args, **kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag, weak=True)
+                if last_modified is not None:
+                    response.last_modified = last_modified
+                # Let browsers and CDNs keep the body but revalidate every time
+                response.cache_control.no_cache = True
+                if 'Authorization' in request.headers:
+                    response.cache_control.private = True
+            return response
+        
+        return decorated_function
+    return decorator
@@ -1,23 +1,64 @@
-from flask import Blueprint, jsonify, request
-from ..services import customer_service
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from ..imports import detect_format, read_rows
+from ..services import customer_service, import_service, version_service
 from .auth import require_auth
+from .batch import batch_response, parse_ids
+from .conditional import conditional
 
 bp = Blueprint("customers", __name__)
 
 '''
     GET /api/customers
     Get all customers
+    Query: limit=<int>&cursor=<next from previous page> for keyset pagination, stream=1 to stream the full list
 '''
 @bp.get("/")
+@conditional(version_service.customers_version)
 def get_customers():
-    result = customer_service.get_customers()
-    return jsonify(result), 200
+    if request.args.get('stream') in ('1', 'true'):
+        return Response(stream_with_context(customer_service.stream_customers()), mimetype="application/json")
+
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    if limit is None and not cursor:
+        result = customer_service.get_customers()
+        return jsonify(result), 200
+
+    result, status_code = customer_service.get_customers_page(limit, cursor)
+    return jsonify(result), status_code
+
+'''
+    GET /api/customers/search?q=<search_term>&limit=<int>&cursor=<next>
+    Search customers by id (exact or prefix) or by first/last name prefix
+'''
+@bp.get("/search")
+@conditional(version_service.customers_version)
+def search_customers():
+    search_term = request.args.get('q', '').strip()
+    if not search_term:
+        return {"error": "Search term is required"}, 400
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    result, status_code = customer_service.search_customers(search_term, limit, cursor)
+    return jsonify(result), status_code
+
+'''
+    GET /api/customers/batch?ids=1,2,3
+    Get details for several customers keyed by id; unknown ids get a not-found entry
+'''
+@bp.get("/batch")
+def get_customers_batch():
+    ids, error = parse_ids()
+    if error:
+        return error
+    return batch_response("customers", ids, customer_service.get_customers_by_id(ids), "Customer")
 
 '''
     GET /api/customers/<customer_id>
     Get customer details
 '''
 @bp.get("/<int:customer_id>")
+@conditional(version_service.customer_version)
 def get_customer_details(customer_id: int):
     result = customer_service.get_customer_details(customer_id)
     if not result:
@@ -51,6 +92,24 @@ def create_customer():
     
     return jsonify(result), 201
 
+'''
+    POST /api/customers/import?format=csv|ndjson&batch_size=<int>
+    Bulk-import customers from a CSV (header row) or NDJSON body; format defaults from the Content-Type (requires authentication)
+    Row: {"first_name": str, "last_name": str, "email": str (optional), "store_id": int (optional), "active": 0|1 (optional),
+          and either "address_id": int or "address", "address2", "district", "city_id", "postal_code", "phone"}
+'''
+@bp.post("/import")
+@require_auth
+def import_customers(staff_id):
+    fmt = detect_format(request.args.get('format'), request.content_type)
+    if fmt is None:
+        return {"error": "format must be csv or ndjson"}, 400
+    batch_size = request.args.get('batch_size', import_service.IMPORT_BATCH_SIZE, type=int)
+    if not 1 <= batch_size <= import_service.MAX_IMPORT_BATCH_SIZE:
+        return {"error": f"batch_size must be between 1 and {import_service.MAX_IMPORT_BATCH_SIZE}"}, 400
+    result, status_code = import_service.import_customers(read_rows(request.stream, fmt), batch_size)
+    return jsonify(result), status_code
+
 '''
     PUT /api/customers/<customer_id>
     Update customer details
@@ -89,15 +148,19 @@ def delete_customer(customer_id: int, staff_id):
     return jsonify(result), status_code
 
 '''
-    GET /api/customers/<customer_id>/rentals
-    Get customer rental history (active and past rentals)
+    GET /api/customers/<customer_id>/rentals?limit=<int>&active_cursor=<active_next>&past_cursor=<past_next>
+    Get customer rental history (active and past rentals, each paginated newest first)
 '''
 @bp.get("/<int:customer_id>/rentals")
 @require_auth
+@conditional(version_service.customer_rentals_version)
 def get_customer_rental_history(customer_id: int, staff_id):
-    result = customer_service.get_customer_rental_history(customer_id)
-    if isinstance(result, dict) and 'error' in result:
-        status_code = 404 if "not found" in result.get('error', '') else 500
+    limit = request.args.get('limit', type=int)
+    active_cursor = request.args.get('active_cursor')
+    past_cursor = request.args.get('past_cursor')
+    result = customer_service.get_customer_rental_history(customer_id, limit, active_cursor, past_cursor)
+    if isinstance(result, tuple):
+        result, status_code = result
         return jsonify(result), status_code
     
     return jsonify(result), 200
@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify, request
-from ..services import film_service
+from ..services import film_service, version_service
+from .batch import batch_response, parse_ids
+from .conditional import conditional
 
 bp = Blueprint("films", __name__)
 
@@ -8,25 +10,71 @@ bp = Blueprint("films", __name__)
     Returns top 5 rented films of all time.
 '''
 @bp.get("/top5")
+@conditional(version_service.top_films_version)
 def top_films():
     return jsonify(film_service.top_5_rented_films())
 
+'''
+    GET /api/films/batch?ids=1,2,3
+    Returns details for several films keyed by id; unknown ids get a not-found entry.
+'''
+@bp.get("/batch")
+def film_batch():
+    ids, error = parse_ids()
+    if error:
+        return error
+    return batch_response("films", ids, film_service.films_by_id(ids), "Film")
+
 '''
     GET /api/films/<film_id>
     Returns details for a single film.
 '''
 @bp.get("/<int:film_id>")
+@conditional(version_service.film_version)
 def film_detail(film_id: int):
     film = film_service.film_detail(film_id)
     if not film:
         return {"error": "Film not found"}, 404
     return jsonify(film)
 
+'''
+    GET /api/films/search?q=<search_term>&fields=title,actor,genre&limit=<int>&cursor=<next>
+    Ranked search across titles, actor names and genres (all three unless fields is given), one page at a time.
+'''
+@bp.get("/search")
+@conditional(version_service.catalog_version)
+def search_films():
+    search_term = request.args.get('q', '').strip()
+    if not search_term:
+        return {"error": "Search term is required"}, 400
+    fields = [f.strip() for f in request.args.get('fields', '').split(",") if f.strip()]
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    result, status_code = film_service.search_films(search_term, fields, limit, cursor)
+    return jsonify(result), status_code
+
+'''
+    GET /api/films/search/text?q=<search_term>&mode=natural|boolean&limit=<int>&cursor=<next>
+    Full-text search over titles and descriptions, best matches first, with relevance scores and highlighted snippets.
+'''
+@bp.get("/search/text")
+@conditional(version_service.catalog_version)
+def search_films_fulltext():
+    search_term = request.args.get('q', '').strip()
+    if not search_term:
+        return {"error": "Search term is required"}, 400
+    mode = request.args.get('mode', 'natural')
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    result, status_code = film_service.fulltext_search_films(search_term, mode, limit, cursor)
+    return jsonify(result), status_code
+
 '''
     GET /api/films/search/title?q=<search_term>
     Search films by title.
 '''
 @bp.get("/search/title")
+@conditional(version_service.search_index_version)
 def search_films_by_title():
     search_term = request.args.get('q', '')
     if not search_term:
@@ -39,6 +87,7 @@ def search_films_by_title():
     Search films by actor name.
 '''
 @bp.get("/search/actor")
+@conditional(version_service.search_index_version)
 def search_films_by_actor():
     search_term = request.args.get('q', '')
     if not search_term:
@@ -51,6 +100,7 @@ def search_films_by_actor():
     Search films by genre.
 '''
 @bp.get("/search/genre")
+@conditional(version_service.search_index_version)
 def search_films_by_genre():
     search_term = request.args.get('q', '')
     if not search_term:
@@ -1,6 +1,10 @@
-from flask import Blueprint, jsonify, request
-from ..services import rental_service
+from datetime import datetime
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from ..reports import FORMATS, OVERDUE_FIELDS, encode
+from ..services import rental_service, version_service
 from .auth import require_auth
+from .batch import batch_response, parse_ids
+from .conditional import conditional
 
 bp = Blueprint("rentals", __name__)
 
@@ -26,11 +30,104 @@ def create_rental(staff_id):
     result, status_code = rental_service.create_rental(customer_id, film_id, staff_id)
     return jsonify(result), status_code
 
+'''
+    POST /api/rentals/bulk
+    Rent several films to one customer in one transaction (requires authentication)
+    Payload: {"customer_id": int, "film_ids": [int]}
+'''
+@bp.post("/bulk")
+@require_auth
+def create_rentals(staff_id):
+    data = request.get_json()
+    
+    if not data:
+        return {"error": "Request body is required"}, 400
+    
+    customer_id = data.get('customer_id')
+    film_ids = data.get('film_ids')
+    
+    if not customer_id or not isinstance(film_ids, list) or not film_ids:
+        return {"error": "customer_id and a non-empty film_ids list are required"}, 400
+    if len(film_ids) > rental_service.MAX_BULK_ITEMS:
+        return {"error": f"At most {rental_service.MAX_BULK_ITEMS} films per request"}, 400
+    if not all(isinstance(film_id, int) for film_id in film_ids):
+        return {"error": "film_ids must be integers"}, 400
+    
+    result, status_code = rental_service.create_rentals(customer_id, film_ids, staff_id)
+    return jsonify(result), status_code
+
+'''
+    PUT /api/rentals/bulk/return
+    Return several rentals in one transaction (requires authentication)
+    Payload: {"rental_ids": [int]}
+'''
+@bp.put("/bulk/return")
+@require_auth
+def return_rentals(staff_id):
+    data = request.get_json()
+    
+    if not data:
+        return {"error": "Request body is required"}, 400
+    
+    rental_ids = data.get('rental_ids')
+    
+    if not isinstance(rental_ids, list) or not rental_ids:
+        return {"error": "A non-empty rental_ids list is required"}, 400
+    if len(rental_ids) > rental_service.MAX_BULK_ITEMS:
+        return {"error": f"At most {rental_service.MAX_BULK_ITEMS} rentals per request"}, 400
+    if not all(isinstance(rental_id, int) for rental_id in rental_ids):
+        return {"error": "rental_ids must be integers"}, 400
+    
+    result, status_code = rental_service.return_rentals(rental_ids)
+    return jsonify(result), status_code
+
+'''
+    GET /api/rentals/batch?ids=1,2,3
+    Get details for several rentals keyed by id; unknown ids get a not-found entry
+'''
+@bp.get("/batch")
+def get_rentals_batch():
+    ids, error = parse_ids()
+    if error:
+        return error
+    return batch_response("rentals", ids, rental_service.rentals_by_id(ids), "Rental")
+
+'''
+    GET /api/rentals/overdue?store_id=<int>&min_days=<int>&as_of=<ISO datetime>&format=ndjson|csv
+    Stream overdue open rentals, one per line (requires authentication)
+'''
+@bp.get("/overdue")
+@require_auth
+def get_overdue_rentals(staff_id):
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in FORMATS:
+        return {"error": "format must be ndjson or csv"}, 400
+    store_id = request.args.get('store_id', type=int)
+    min_days = request.args.get('min_days', 0, type=int)
+    if min_days < 0:
+        return {"error": "min_days must not be negative"}, 400
+    as_of = None
+    if request.args.get('as_of'):
+        try:
+            as_of = datetime.fromisoformat(request.args['as_of'])
+        except ValueError:
+            return {"error": "as_of must be an ISO datetime"}, 400
+        # Rental dates are stored as naive server-local times; convert here, since an error once the stream has started would truncate it
+        if as_of.tzinfo is not None:
+            as_of = as_of.astimezone().replace(tzinfo=None)
+
+    rows = rental_service.overdue_rentals(store_id, min_days, as_of)
+    response = Response(stream_with_context(encode(rows, fmt, OVERDUE_FIELDS)), mimetype=FORMATS[fmt])
+    if fmt == "csv":
+        response.headers["Content-Disposition"] = "attachment; filename=overdue-rentals.csv"
+    return response
+
 '''
     GET /api/rentals/<rental_id>
     Get rental details
 '''
 @bp.get("/<int:rental_id>")
+@conditional(version_service.rental_version)
 def get_rental_details(rental_id: int):
     result, status_code = rental_service.get_rental_details(rental_id)
     return jsonify(result), status_code
@@ -0,0 +1,294 @@
+import threading
+from sqlalchemy import func
+from .db import get_session, models
+from .polling import PolledCache, probe_table
+
+# Longest n-gram stored in the postings; shorter search terms are answered straight from the postings
+GRAM_SIZE = 3
+
+''' Every 1..GRAM_SIZE-gram of a string '''
+def _grams(text: str):
+    grams = set()
+    for n in range(1, GRAM_SIZE + 1):
+        for i in range(len(text) - n + 1):
+            grams.add(text[i:i + n])
+    return grams
+
+
+class NgramIndex:
+    ''' Case-insensitive substring index: key -> text, with n-gram postings pointing back at keys '''
+
+    def __init__(self):
+        self.texts = {}
+        self.postings = {}
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, key, text):
+        self.remove(key)
+        text = (text or "").lower()
+        self.texts[key] = text
+        for gram in _grams(text):
+            self.postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key):
+        text = self.texts.pop(key, None)
+        if text is None:
+            return
+        for gram in _grams(text):
+            keys = self.postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[gram]
+
+    ''' Return the keys whose text contains term (same semantics as ilike '%term%') '''
+    def search(self, term: str):
+        term = term.lower()
+        if not term:
+            return set(self.texts)
+        if len(term) <= GRAM_SIZE:
+            return set(self.postings.get(term, ()))
+
+        # Intersect the postings of every gram in the term, smallest first, then verify
+        grams = {term[i:i + GRAM_SIZE] for i in range(len(term) - GRAM_SIZE + 1)}
+        postings = sorted((self.postings.get(g, set()) for g in grams), key=len)
+        candidates = set(postings[0])
+        for keys in postings[1:]:
+            if not candidates:
+                break
+            candidates &= keys
+        return {k for k in candidates if term in self.texts[k]}
+
+
+class _CatalogState:
+    ''' One consistent copy of everything the film searches need '''
+
+    def __init__(self):
+        self.titles = NgramIndex()      # film_id -> film_text.title
+        self.actors = NgramIndex()      # actor_id -> "first_name last_name"
+        self.categories = NgramIndex()  # category_id -> category.name
+        self.film_actors = set()        # (actor_id, film_id)
+        self.film_categories = set()    # (category_id, film_id)
+        self.actor_films = {}           # actor_id -> {film_id}
+        self.category_films = {}        # category_id -> {film_id}
+        self.high_water = {}            # table name -> max(last_update) already applied
+
+    def sizes(self):
+        return {
+            "film": len(self.titles),
+            "actor": len(self.actors),
+            "category": len(self.categories),
+            "film_actor": len(self.film_actors),
+            "film_category": len(self.film_categories),
+        }
+
+    def add_film(self, film_id, title):
+        self.titles.add(film_id, title)
+
+    def add_actor(self, actor_id, first_name, last_name):
+        self.actors.add(actor_id, f"{first_name} {last_name}")
+
+    def add_category(self, category_id, name):
+        self.categories.add(category_id, name)
+
+    def add_film_actor(self, actor_id, film_id):
+        self.film_actors.add((actor_id, film_id))
+        self.actor_films.setdefault(actor_id, set()).add(film_id)
+
+    def add_film_category(self, category_id, film_id):
+        self.film_categories.add((category_id, film_id))
+        self.category_films.setdefault(category_id, set()).add(film_id)
+
+
+''' Tables polled for changes, in the order deltas are applied '''
+TRACKED_TABLES = ("film", "actor", "category", "film_actor", "film_category")
+
+
+class FilmSearchIndex(PolledCache):
+    '''
+        Process-local search index over the film catalog.
+        Built once at startup, then kept fresh by polling the last_update columns of the tracked tables.
+        Rows are never deleted through last_update, so a row-count mismatch after applying deltas triggers a full rebuild.
+    '''
+    name = "Film search index"
+
+    def __init__(self):
+        super().__init__()
+        self._state = None
+        self._lock = threading.RLock()
+
+    @property
+    def ready(self):
+        return self._state is not None
+
+    ''' Load the whole catalog into a fresh state and swap it in '''
+    def rebuild(self):
+        session = get_session()
+        film, film_text, actor, category = models["film"], models["film_text"], models["actor"], models["category"]
+        film_actor, film_category = models["film_actor"], models["film_category"]
+
+        state = _CatalogState()
+        for fid, title, text_title in (
+            session.query(film.film_id, film.title, film_text.title)
+            .outerjoin(film_text, film_text.film_id == film.film_id)
+        ):
+            state.add_film(fid, text_title if text_title is not None else title)
+        for aid, first_name, last_name in session.query(actor.actor_id, actor.first_name, actor.last_name):
+            state.add_actor(aid, first_name, last_name)
+        for cid, name in session.query(category.category_id, category.name):
+            state.add_category(cid, name)
+        for aid, fid in session.query(film_actor.actor_id, film_actor.film_id):
+            state.add_film_actor(aid, fid)
+        for cid, fid in session.query(film_category.category_id, film_category.film_id):
+            state.add_film_category(cid, fid)
+
+        for table in TRACKED_TABLES:
+            state.high_water[table] = session.query(func.max(models[table].last_update)).scalar()
+
+        with self._lock:
+            self._state = state
+            self.mark_refreshed()
+
+    ''' Apply rows changed since the last poll; fall back to a rebuild when rows were deleted '''
+    def refresh(self):
+        session = get_session()
+        state = self._state
+        if state is None:
+            return self.rebuild()
+
+        probes = {table: probe_table(session, table) for table in TRACKED_TABLES}
+
+        changed = {
+            table: state.high_water.get(table)
+            for table, (count, latest) in probes.items()
+            if latest is not None and (state.high_water.get(table) is None or latest > state.high_water[table])
+        }
+        deltas = self._load_deltas(session, changed)
+
+        with self._lock:
+            for table, rows in deltas.items():
+                for row in rows:
+                    if table == "film":
+                        state.add_film(row[0], row[2] if row[2] is not None else row[1])
+                    elif table == "actor":
+                        state.add_actor(*row)
+                    elif table == "category":
+                        state.add_category(*row)
+                    elif table == "film_actor":
+                        state.add_film_actor(*row)
+                    elif table == "film_category":
+                        state.add_film_category(*row)
+            for table in changed:
+                state.high_water[table] = probes[table][1]
+            self.mark_refreshed()
+            stale = any(state.sizes()[table] != count for table, (count, latest) in probes.items())
+
+        if stale:
+            self.rebuild()
+
+    ''' Fetch rows with last_update at or after each table's high-water mark (>= so same-second writes are not missed) '''
+    def _load_deltas(self, session, changed):
+        film, film_text = models["film"], models["film_text"]
+        deltas = {}
+        for table, since in changed.items():
+            t = models[table]
+            if table == "film":
+                q = (
+                    session.query(film.film_id, film.title, film_text.title)
+                    .outerjoin(film_text, film_text.film_id == film.film_id)
+                )
+            elif table == "actor":
+                q = session.query(t.actor_id, t.first_name, t.last_name)
+            elif table == "category":
+                q = session.query(t.category_id, t.name)
+            elif table == "film_actor":
+                q = session.query(t.actor_id, t.film_id)
+            else:
+                q = session.query(t.category_id, t.film_id)
+            if since is not None:
+                q = q.filter(t.last_update >= since)
+            deltas[table] = q.all()
+        return deltas
+
+    ''' The catalog the index currently serves, as a comparable value (None when unavailable) '''
+    def version(self):
+        if not self.enabled:
+            return None
+        self.maybe_refresh()
+        if not self.ready:
+            return None
+        with self._lock:
+            state = self._state
+            return (tuple(sorted(state.high_water.items())), tuple(sorted(state.sizes().items())))
+
+    '''
+        Film ids whose title contains term, ranked like the SQL case():
+        1 exact, 2 starts with, 3 ends with, 4 contains, then by title.
+        Returns None when the index is disabled or not built so callers can fall back to SQL.
+    '''
+    def search_titles(self, term: str):
+        if not self.enabled:
+            return None
+        self.maybe_refresh()
+        if not self.ready:
+            return None
+        needle = term.lower()
+        with self._lock:
+            titles = self._state.titles
+            matches = [(fid, titles.texts[fid]) for fid in titles.search(needle)]
+
+        def rank(title):
+            if title == needle:
+                return 1
+            if title.startswith(needle):
+                return 2
+            if title.endswith(needle):
+                return 3
+            return 4
+
+        return [fid for fid, title in sorted(matches, key=lambda m: (rank(m[1]), m[1], m[0]))]
+
+    ''' Film ids featuring an actor whose first, last or full name contains term '''
+    def search_actors(self, term: str):
+        if not self.enabled:
+            return None
+        self.maybe_refresh()
+        if not self.ready:
+            return None
+        with self._lock:
+            state = self._state
+            film_ids = set()
+            for aid in state.actors.search(term):
+                film_ids |= state.actor_films.get(aid, set())
+            return sorted(fid for fid in film_ids if fid in state.titles.texts)
+
+    ''' Film ids in a category whose name contains term '''
+    def search_genres(self, term: str):
+        if not self.enabled:
+            return None
+        self.maybe_refresh()
+        if not self.ready:
+            return None
+        with self._lock:
+            state = self._state
+            film_ids = set()
+            for cid in state.categories.search(term):
+                film_ids |= state.category_films.get(cid, set())
+            return sorted(fid for fid in film_ids if fid in state.titles.texts)
+
+
+film_search_index = FilmSearchIndex()
+
+def init_search_index(app):
+    if not app.config.get("SEARCH_INDEX_ENABLED"):
+        return
+    film_search_index.enabled = True
+    film_search_index.refresh_seconds = app.config["SEARCH_INDEX_REFRESH_SECONDS"]
+    with app.app_context():
+        try:
+            film_search_index.rebuild()
+        except Exception as e:
+            # Searches fall back to SQL until a rebuild succeeds
+            app.logger.warning(f"Film search index build failed: {str(e)}")
@@ -1,23 +1,39 @@
 from sqlalchemy import func
-from ..db import get_session, models
+from ..db import get_session, models, read_replica
+from ..leaderboard import leaderboards
+from ..shared_cache import cached
+from .batching import id_chunks
 
 ''' Return actor details '''
+@cached(tags=lambda actor_id: [f"actor:{actor_id}"])
 def actor_detail(actor_id: int):
+    return actors_by_id([actor_id]).get(actor_id)
+
+''' Details for many actors keyed by actor_id, one IN query per chunk (missing actors are left out) '''
+@read_replica
+def actors_by_id(actor_ids):
     session = get_session()
     actor = models["actor"]
-    a = session.get(actor, actor_id)
-    if not a:
-        return None
-    return {
-        "actor_id": a.actor_id, 
-        "first_name": a.first_name, 
-        "last_name": a.last_name,
-        "last_update": a.last_update.isoformat() if a.last_update else None
-    }
+    found = {}
+    for chunk in id_chunks(actor_ids):
+        rows = session.query(actor.actor_id, actor.first_name, actor.last_name, actor.last_update).filter(actor.actor_id.in_(chunk))
+        for aid, first_name, last_name, last_update in rows:
+            found[aid] = {
+                "actor_id": aid,
+                "first_name": first_name,
+                "last_name": last_name,
+                "last_update": last_update.isoformat() if last_update else None
+            }
+    return found
 
 
 ''' Return top 5 actors appearing in films '''
+@read_replica
 def top_5_actors():
+    top = leaderboards.top_actors(5)
+    if top is not None:
+        return top
+
     session = get_session()
     actor, film_actor, inventory = models["actor"], models["film_actor"], models["inventory"]
     q = (
@@ -39,8 +55,13 @@ def top_5_actors():
         for aid, fn, ln, n in q
     ]
 
-''' Return top 5 most-rented films for a given actor '''
-def actor_top_5_rented_films(actor_id: int):
+''' Return the most-rented films for a given actor (5 by default) '''
+@read_replica
+def actor_top_rented_films(actor_id: int, limit: int = 5):
+    top = leaderboards.actor_top_films(actor_id, limit)
+    if top is not None:
+        return top
+
     session = get_session()
     film, film_actor, inventory, rental = models["film"], models["film_actor"], models["inventory"], models["rental"]
     q = (
@@ -54,7 +75,7 @@ def actor_top_5_rented_films(actor_id: int):
         .join(rental, rental.inventory_id == inventory.inventory_id)
         .filter(film_actor.actor_id == actor_id)
         .group_by(film.film_id, film.title)
-        .order_by(func.count(rental.rental_id).desc())
-        .limit(5)
+        .order_by(func.count(rental.rental_id).desc(), film.film_id)
+        .limit(limit)
     ).all()
     return [{"film_id": fid, "title": title, "rentals": int(count)} for fid, title, count in q]
\ No newline at end of file
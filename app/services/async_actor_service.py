@@ -0,0 +1,24 @@
+from ..db import models
+from ..async_db import get_async_session
+from ..shared_cache import cached_like
+from . import actor_service
+
+'''
+    Async version of the actor detail read for the ASGI entry point (same query and shared-cache entries as actor_service).
+    Top actors and an actor's top films come from the leaderboards in the Flask app, so they have no async version.
+'''
+
+''' Return actor details '''
+@cached_like(actor_service.actor_detail)
+async def actor_detail(actor_id: int):
+    session = get_async_session()
+    actor = models["actor"]
+    a = await session.get(actor, actor_id)
+    if not a:
+        return None
+    return {
+        "actor_id": a.actor_id,
+        "first_name": a.first_name,
+        "last_name": a.last_name,
+        "last_update": a.last_update.isoformat() if a.last_update else None
+    }
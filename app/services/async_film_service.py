@@ -0,0 +1,110 @@
+from ..db import models
+from ..async_db import get_async_session
+from ..shared_cache import cached_like
+from . import film_service
+from .film_service import _format_film
+from .projections import film_columns
+from sqlalchemy import case, or_, select
+
+'''
+    Async versions of the film read functions for the ASGI entry point.
+    Same queries and output as film_service, issued through an AsyncSession. Film details share film_service's
+    shared-cache entries; top films come from the leaderboards and searches from the search index in the Flask app,
+    so the ASGI app only serves those natively when the in-memory structure is off (see asgi.create_asgi_app).
+'''
+
+''' Return details for many films in three queries, in the same order as film_ids (missing films are skipped) '''
+async def film_details(film_ids):
+    session = get_async_session()
+    film, film_actor, actor, film_category, category = models["film"], models["film_actor"], models["actor"], models["film_category"], models["category"]
+
+    film_ids = list(dict.fromkeys(film_ids))
+    if not film_ids:
+        return []
+
+    films = {f.film_id: f for f in (await session.execute(select(*film_columns()).where(film.film_id.in_(film_ids))))}
+
+    actors_by_film = {}
+    actors_query = (
+        select(film_actor.film_id, actor.actor_id, actor.first_name, actor.last_name)
+        .join(actor, actor.actor_id == film_actor.actor_id)
+        .where(film_actor.film_id.in_(list(films)))
+        .order_by(actor.first_name, actor.last_name)
+    )
+    for fid, aid, first_name, last_name in await session.execute(actors_query):
+        actors_by_film.setdefault(fid, []).append({
+            "actor_id": aid,
+            "first_name": first_name,
+            "last_name": last_name,
+            "full_name": f"{first_name} {last_name}"
+        })
+
+    category_by_film = {}
+    category_query = (
+        select(film_category.film_id, category.category_id, category.name)
+        .join(category, category.category_id == film_category.category_id)
+        .where(film_category.film_id.in_(list(films)))
+    )
+    for fid, cid, name in await session.execute(category_query):
+        category_by_film.setdefault(fid, {"category_id": cid, "name": name})
+
+    return [
+        _format_film(films[fid], actors_by_film.get(fid, []), category_by_film.get(fid))
+        for fid in film_ids if fid in films
+    ]
+
+''' Return details for a single film '''
+@cached_like(film_service.film_detail)
+async def film_detail(film_id: int):
+    docs = await film_details([film_id])
+    return docs[0] if docs else None
+
+''' Search films by film title '''
+async def search_films_by_title(search_term: str):
+    session = get_async_session()
+    film, film_text = models["film"], models["film_text"]
+
+    ranking = case(
+        (film_text.title.ilike(search_term), 1),
+        (film_text.title.ilike(f"{search_term}%"), 2),
+        (film_text.title.ilike(f"%{search_term}"), 3),
+        else_=4
+    )
+    q = (
+        select(film.film_id)
+        .join(film_text, film.film_id == film_text.film_id)
+        .where(film_text.title.ilike(f"%{search_term}%"))
+        .order_by(ranking, film_text.title)
+    )
+    return await film_details((await session.scalars(q)).all())
+
+''' Search films by actor name '''
+async def search_films_by_actor(search_term: str):
+    session = get_async_session()
+    film, film_actor, actor = models["film"], models["film_actor"], models["actor"]
+    q = (
+        select(film.film_id)
+        .join(film_actor, film_actor.film_id == film.film_id)
+        .join(actor, actor.actor_id == film_actor.actor_id)
+        .where(
+            or_(
+                actor.first_name.ilike(f"%{search_term}%"),
+                actor.last_name.ilike(f"%{search_term}%"),
+                (actor.first_name + " " + actor.last_name).ilike(f"%{search_term}%")
+            )
+        ).distinct()
+    )
+    return await film_details((await session.scalars(q)).all())
+
+''' Search films by genre '''
+async def search_films_by_genre(search_term: str):
+    session = get_async_session()
+    film, film_category, category = models["film"], models["film_category"], models["category"]
+    q = (
+        select(film.film_id)
+        .join(film_category, film_category.film_id == film.film_id)
+        .join(category, category.category_id == film_category.category_id)
+        .where(category.name.ilike(f"%{search_term}%"))
+        .distinct()
+    )
+    return await film_details((await session.scalars(q)).all())
@@ -0,0 +1,20 @@
+from ..async_db import get_async_session
+from ..search_index import film_search_index
+from .version_service import _with_cache_version, actor_columns, catalog_columns, film_columns, found, probed_row
+from sqlalchemy import select
+
+''' Async versions of the conditional-GET probes for the ASGI entry point (same columns and versions as version_service) '''
+
+''' Run scalar subqueries in one round trip through the request's AsyncSession '''
+async def _probe(*columns):
+    session = get_async_session()
+    return probed_row(tuple((await session.execute(select(*columns))).one()))
+
+async def film_version(film_id: int, **kwargs):
+    return found(await _probe(*film_columns(film_id)))
+
+async def actor_version(actor_id: int, **kwargs):
+    return found(await _probe(*actor_columns(actor_id)))
+
+async def search_index_version(**kwargs):
+    return _with_cache_version(await _probe(*catalog_columns()), film_search_index)
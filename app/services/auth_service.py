@@ -1,8 +1,18 @@
 import jwt
+import time
 from datetime import datetime, timedelta, timezone
 from ..db import get_session, models
+from ..ttl_cache import TTLCache
 from flask import current_app
 
+# Verified tokens -> staff_id, so repeat requests skip the JWT decode
+_token_cache = TTLCache(maxsize=10000)
+
+# staff_id -> staff.active for staff known to exist, so repeat requests skip the staff lookup.
+# The app never writes staff rows, so entries are only dropped by AUTH_STAFF_CACHE_TTL: a deactivated or deleted
+# staff member's tokens keep working for at most that long
+_staff_cache = TTLCache(maxsize=1000)
+
 ''' Generate JWT token for staff member '''
 def generate_token(staff_id: int):
     payload = {
@@ -16,20 +26,17 @@ def generate_token(staff_id: int):
 
 ''' Verify JWT token and return staff_id '''
 def verify_token(token):
-   
+    staff_id = _token_cache.get(token)
+    if staff_id is not None:
+        if _staff_cache.get(staff_id):
+            return staff_id, None
+        # Staff entry expired or the staff member is inactive: let _verify_staff decide
+        return _verify_staff(token, staff_id, None)
+
     try:
         payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
         staff_id = payload['staff_id']
-        
-        # Verify staff exists in database
-        session = get_session()
-        staff = models["staff"]
-        staff_obj = session.get(staff, staff_id)
-        
-        if not staff_obj:
-            return None, "Staff member not found"
-        
-        return staff_id, None
+        return _verify_staff(token, staff_id, payload.get('exp'))
         
     except jwt.ExpiredSignatureError:
         return None, "Token has expired"
@@ -38,6 +45,33 @@ def verify_token(token):
     except Exception as e:
         return None, f"Token verification failed: {str(e)}"
 
+''' Check that the staff member exists and is active, and remember the verified token (never past its exp) '''
+def _verify_staff(token, staff_id, exp):
+    try:
+        active = _staff_cache.get(staff_id)
+        if active is None:
+            # Verify staff exists in database
+            session = get_session()
+            staff = models["staff"]
+            staff_obj = session.get(staff, staff_id)
+            
+            if not staff_obj:
+                _token_cache.pop(token)
+                return None, "Staff member not found"
+            
+            active = bool(staff_obj.active)
+            _staff_cache.set(staff_id, active, time.time() + current_app.config['AUTH_STAFF_CACHE_TTL'])
+    except Exception as e:
+        return None, f"Token verification failed: {str(e)}"
+
+    if not active:
+        _token_cache.pop(token)
+        return None, "Staff member is inactive"
+
+    if exp is not None:
+        _token_cache.set(token, staff_id, min(exp, time.time() + current_app.config['AUTH_TOKEN_CACHE_TTL']))
+    return staff_id, None
+
 ''' Authenticate staff member with username and password '''
 def authenticate_staff(username: str, password: str):
     
@@ -57,6 +91,9 @@ def authenticate_staff(username: str, password: str):
     if staff_obj.password != password:
         return None, "Invalid username or password"
     
+    if not staff_obj.active:
+        return None, "Staff member is inactive"
+    
     return staff_obj.staff_id, None
 
 ''' Get staff member details '''
@@ -0,0 +1,7 @@
+# Ids per IN (...) list, keeping statements well under driver and database parameter limits
+IN_CHUNK_SIZE = 500
+
+''' Distinct ids in first-seen order, split into IN-sized chunks '''
+def id_chunks(ids, size: int = IN_CHUNK_SIZE):
+    ids = list(dict.fromkeys(ids))
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
@@ -1,85 +1,233 @@
-from ..db import get_session, models
+from ..data_versions import data_versions
+from ..db import get_session, models, read_replica
+from .pagination import page_size, encode_cursor, decode_cursor, keyset_after, parse_datetime
+from .batching import id_chunks
+from .projections import customer_columns, customer_address_join, customer_doc, rental_history_columns, rental_history_doc
 from datetime import datetime, timedelta
-from sqlalchemy import or_, func
+from flask import current_app
+from sqlalchemy import and_, or_, case, func, literal, select, union_all
 
-''' Helper function to format customer data '''
-def _format_customer_data(customer_obj, address_obj=None):
-    return {
-        "customer_id": customer_obj.customer_id,
-        "first_name": customer_obj.first_name,
-        "last_name": customer_obj.last_name,
-        "email": customer_obj.email if hasattr(customer_obj, 'email') else None,
-        "store_id": customer_obj.store_id,
-        "address_id": customer_obj.address_id,
-        "address": {
-            "address_id": address_obj.address_id,
-            "address": address_obj.address,
-            "address2": address_obj.address2 if hasattr(address_obj, 'address2') else None,
-            "district": address_obj.district,
-            "city_id": address_obj.city_id,
-            "postal_code": address_obj.postal_code if hasattr(address_obj, 'postal_code') else None,
-            "phone": address_obj.phone if hasattr(address_obj, 'phone') else None
-        } if address_obj else None,
-        "active": customer_obj.active,
-        "create_date": customer_obj.create_date.isoformat() if customer_obj.create_date else None,
-        "last_update": customer_obj.last_update.isoformat() if customer_obj.last_update else None
-    }
+# Rows fetched per server-side cursor round trip (and per JSON chunk) when streaming
+STREAM_CHUNK_SIZE = 1000
+
+# Most candidates a single kind of name match may contribute to a customer search
+SEARCH_RESULT_CAP = 1000
 
 ''' Get all customers '''
+@read_replica
 def get_customers():
     session = get_session()
-    customer, address = models["customer"], models["address"]
+    customer = models["customer"]
     
     # Get all customers with their addresses
-    customers = (
-        session.query(customer, address)
-        .outerjoin(address, address.address_id == customer.address_id)
+    rows = (
+        session.query(*customer_columns())
+        .outerjoin(*customer_address_join())
         .order_by(customer.last_name, customer.first_name)
         .all()
     )
     
-    return [_format_customer_data(c, a) for c, a in customers]
+    return [customer_doc(row) for row in rows]
 
-''' Search customers by id, first name, or last name '''
-def search_customers(search_term: str):
+''' Get one page of customers ordered by (last_name, first_name, customer_id), continuing after cursor '''
+@read_replica
+def get_customers_page(limit: int = None, cursor: str = None):
     session = get_session()
-    customer, address = models["customer"], models["address"]
-    
-    # Build search query
-    search_filter = or_(
-        customer.customer_id.ilike(f"%{search_term}%"),
-        customer.first_name.ilike(f"%{search_term}%"),
-        customer.last_name.ilike(f"%{search_term}%")
+    customer = models["customer"]
+    limit = page_size(limit)
+    sort_key = (customer.last_name, customer.first_name, customer.customer_id)
+
+    q = session.query(*customer_columns()).outerjoin(*customer_address_join())
+    if cursor:
+        try:
+            after = decode_cursor(cursor, (str, str, int))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        q = q.filter(keyset_after(sort_key, after))
+
+    # Fetch one extra row to know whether there is a next page
+    rows = q.order_by(*sort_key).limit(limit + 1).all()
+    page = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor([last.last_name, last.first_name, last.customer_id])
+
+    return {
+        "customers": [customer_doc(row) for row in page],
+        "next": next_cursor
+    }, 200
+
+''' Stream all customers as a JSON array in chunks, reading through a server-side cursor '''
+@read_replica
+def stream_customers(chunk_size: int = STREAM_CHUNK_SIZE):
+    session = get_session()
+    customer = models["customer"]
+    dumps = current_app.json.dumps
+
+    q = (
+        session.query(*customer_columns())
+        .outerjoin(*customer_address_join())
+        .order_by(customer.last_name, customer.first_name, customer.customer_id)
+        .yield_per(chunk_size)
     )
-    
-    # Get all matching customers with their addresses
-    customers = (
-        session.query(customer, address)
-        .outerjoin(address, address.address_id == customer.address_id)
-        .filter(search_filter)
-        .order_by(customer.last_name, customer.first_name)
-        .all()
+
+    yield "["
+    separator = ""
+    chunk = []
+    for row in q:
+        chunk.append(dumps(customer_doc(row)))
+        if len(chunk) >= chunk_size:
+            yield separator + ",".join(chunk)
+            separator = ","
+            chunk = []
+    if chunk:
+        yield separator + ",".join(chunk)
+    yield "]"
+
+'''
+    Search customers by id, first name, or last name.
+    A numeric term matches customer_id exactly or by prefix (as PK range scans); otherwise names are prefix-matched
+    so idx_last_name (and an index on first_name, if present) can be used. "first last" / "last first" pairs are supported.
+    Results are ranked, capped at SEARCH_RESULT_CAP candidates per match kind, and keyset-paginated.
+'''
+@read_replica
+def search_customers(search_term: str, limit: int = None, cursor: str = None):
+    search_term = search_term.strip()
+    # isdigit() alone also accepts digits int() can't parse, e.g. "²"
+    if search_term.isascii() and search_term.isdigit():
+        return _search_customers_by_id(search_term, limit, cursor)
+    return _search_customers_by_name(search_term, limit, cursor)
+
+''' Id search: exact id plus every id that starts with the digits, ordered by id (the exact match sorts first) '''
+def _search_customers_by_id(search_term: str, limit: int = None, cursor: str = None):
+    session = get_session()
+    customer = models["customer"]
+    limit = page_size(limit)
+
+    # "12" -> 12, 120..129, 1200..1299, ... up to the largest id in the table.
+    # Ids are never written with leading zeros, so "0", "007" etc. only match the id exactly.
+    # A term above the largest id matches nothing, and is never bound (it may not fit the column or the driver)
+    prefix = int(search_term)
+    max_id = session.query(func.max(customer.customer_id)).scalar() or 0
+    if prefix > max_id:
+        return {"customers": [], "next": None}, 200
+    ranges = [customer.customer_id == prefix]
+    if prefix > 0 and not search_term.startswith("0"):
+        scale = 10
+        while prefix * scale <= max_id:
+            ranges.append(customer.customer_id.between(prefix * scale, (prefix + 1) * scale - 1))
+            scale *= 10
+
+    q = (
+        session.query(*customer_columns())
+        .outerjoin(*customer_address_join())
+        .filter(or_(*ranges))
     )
-    
-    return [_format_customer_data(c, a) for c, a in customers]
+    if cursor:
+        try:
+            after, = decode_cursor(cursor, (int,))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        if after >= max_id:
+            return {"customers": [], "next": None}, 200
+        q = q.filter(customer.customer_id > after)
+
+    rows = q.order_by(customer.customer_id).limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = encode_cursor([page[-1].customer_id]) if len(rows) > limit else None
+
+    return {
+        "customers": [customer_doc(row) for row in page],
+        "next": next_cursor
+    }, 200
+
+''' Name search: ranked union of exact and prefix matches, each branch an index range scan '''
+def _search_customers_by_name(search_term: str, limit: int = None, cursor: str = None):
+    session = get_session()
+    customer = models["customer"]
+    limit = page_size(limit)
+
+    # (rank, condition, order column) for each kind of match; lower rank sorts first
+    tokens = search_term.split()
+    if len(tokens) >= 2:
+        first, last = tokens[0], " ".join(tokens[1:])
+        branches = [
+            (1, and_(customer.first_name == first, customer.last_name == last), customer.last_name),
+            (2, and_(customer.last_name.startswith(last, autoescape=True), customer.first_name.startswith(first, autoescape=True)), customer.last_name),
+            (3, and_(customer.last_name.startswith(first, autoescape=True), customer.first_name.startswith(last, autoescape=True)), customer.last_name),
+        ]
+    else:
+        branches = [
+            (1, customer.last_name == search_term, customer.last_name),
+            (2, customer.first_name == search_term, customer.first_name),
+            (3, customer.last_name.startswith(search_term, autoescape=True), customer.last_name),
+            (4, customer.first_name.startswith(search_term, autoescape=True), customer.first_name),
+        ]
+
+    # Each branch is capped on its own so no single prefix can pull in the whole table
+    matches = union_all(*[
+        select(sub.c.customer_id, sub.c.rank)
+        for sub in (
+            select(customer.customer_id.label("customer_id"), literal(rank).label("rank"))
+            .where(condition)
+            .order_by(order_column, customer.customer_id)
+            .limit(SEARCH_RESULT_CAP)
+            .subquery()
+            for rank, condition, order_column in branches
+        )
+    ]).subquery()
+    best = (
+        select(matches.c.customer_id, func.min(matches.c.rank).label("rank"))
+        .group_by(matches.c.customer_id)
+        .subquery()
+    )
+
+    sort_key = (best.c.rank, customer.last_name, customer.first_name, customer.customer_id)
+    q = (
+        session.query(*customer_columns(), best.c.rank)
+        .join(best, best.c.customer_id == customer.customer_id)
+        .outerjoin(*customer_address_join())
+    )
+    if cursor:
+        try:
+            after = decode_cursor(cursor, (int, str, str, int))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        q = q.filter(keyset_after(sort_key, after))
+
+    rows = q.order_by(*sort_key).limit(limit + 1).all()
+    page = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor([last.rank, last.last_name, last.first_name, last.customer_id])
+
+    return {
+        "customers": [customer_doc(row) for row in page],
+        "next": next_cursor
+    }, 200
 
 ''' Get customer details '''
 def get_customer_details(customer_id: int):
+    return get_customers_by_id([customer_id]).get(customer_id)
+
+''' Details for many customers keyed by customer_id, one IN query per chunk (missing customers are left out) '''
+@read_replica
+def get_customers_by_id(customer_ids):
     session = get_session()
-    customer, address = models["customer"], models["address"]
-    
-    result = (
-        session.query(customer, address)
-        .outerjoin(address, address.address_id == customer.address_id)
-        .filter(customer.customer_id == customer_id)
-        .first()
-    )
-    
-    if not result:
-        return None
-    
-    c, a = result
-    return _format_customer_data(c, a)
+    customer = models["customer"]
+    found = {}
+    for chunk in id_chunks(customer_ids):
+        rows = (
+            session.query(*customer_columns())
+            .outerjoin(*customer_address_join())
+            .filter(customer.customer_id.in_(chunk))
+        )
+        found.update((row.customer_id, customer_doc(row)) for row in rows)
+    return found
 
 ''' Create a new customer '''
 def create_customer(first_name: str, last_name: str, email: str = None, store_id: int = 1, address_id: int = None):
@@ -100,6 +248,7 @@ def create_customer(first_name: str, last_name: str, email: str = None, store_id
     
     try:
         session.add(new_customer)
+        data_versions.bump(session, "customers")
         session.commit()
         return get_customer_details(new_customer.customer_id)
     except Exception as e:
@@ -132,6 +281,7 @@ def update_customer(customer_id: int, first_name: str = None, last_name: str = N
     customer_obj.last_update = datetime.now()
     
     try:
+        data_versions.bump(session, "customers")
         session.commit()
         return get_customer_details(customer_id)
     except Exception as e:
@@ -159,61 +309,79 @@ def delete_customer(customer_id: int):
     
     try:
         session.delete(customer_obj)
+        data_versions.bump(session, "customers")
         session.commit()
         return {"message": "Customer deleted successfully"}, 200
     except Exception as e:
         session.rollback()
         return {"error": f"Failed to delete customer: {str(e)}"}, 500
 
-''' Get customer rental history '''
-def get_customer_rental_history(customer_id: int):
+'''
+    Get customer rental history (active and past rentals).
+    Counts come from one aggregate query; active and past rentals are separate pages, newest first,
+    keyset-paginated on (rental_date, rental_id) and selecting only the columns the response uses.
+'''
+@read_replica
+def get_customer_rental_history(customer_id: int, limit: int = None, active_cursor: str = None, past_cursor: str = None):
     session = get_session()
-    customer, rental, inventory, film = models["customer"], models["rental"], models["inventory"], models["film"]
+    rental = models["rental"]
+    limit = page_size(limit)
     
-    # Check if customer exists
-    customer_obj = session.get(customer, customer_id)
-    if not customer_obj:
+    # Check if customer exists (this is also the customer block of the response)
+    customer_details = get_customer_details(customer_id)
+    if not customer_details:
         return {"error": "Customer not found"}, 404
     
-    # Get all rentals for this customer
-    rentals = (
-        session.query(rental, film)
-        .join(inventory, inventory.inventory_id == rental.inventory_id)
-        .join(film, film.film_id == inventory.film_id)
+    total_rentals, active_count = (
+        session.query(
+            func.count(rental.rental_id),
+            func.coalesce(func.sum(case((rental.return_date.is_(None), 1), else_=0)), 0)
+        )
         .filter(rental.customer_id == customer_id)
-        .order_by(rental.rental_date.desc())
-        .all()
+        .one()
     )
     
-    rentals_list = [{
-        "rental_id": r.rental_id,
-        "film_id": f.film_id,
-        "film_title": f.title,
-        "rental_date": r.rental_date.isoformat(),
-        "return_date": r.return_date.isoformat() if r.return_date else None,
-        "rental_rate": float(f.rental_rate),
-        "is_returned": r.return_date is not None,
-        "inventory_id": r.inventory_id
-    } for r, f in rentals]
-    
-    # Separate active and past rentals
-    active_rentals = [r for r in rentals_list if not r["is_returned"]]
-    past_rentals = [r for r in rentals_list if r["is_returned"]]
-    
-    # Get full customer details
-    customer_details = get_customer_details(customer_id)
-    if not customer_details:
-        return {"error": "Customer not found"}, 404
+    try:
+        active_rentals, active_next = _rental_history_page(customer_id, False, limit, active_cursor)
+        past_rentals, past_next = _rental_history_page(customer_id, True, limit, past_cursor)
+    except ValueError as e:
+        return {"error": str(e)}, 400
     
     return {
         "customer": customer_details,
         "active_rentals": active_rentals,
         "past_rentals": past_rentals,
-        "total_rentals": len(rentals_list),
-        "active_count": len(active_rentals),
-        "past_count": len(past_rentals)
+        "active_next": active_next,
+        "past_next": past_next,
+        "total_rentals": int(total_rentals),
+        "active_count": int(active_count),
+        "past_count": int(total_rentals) - int(active_count)
     }
 
+''' One page of a customer's active or past rentals, newest first; raises ValueError for a bad cursor '''
+def _rental_history_page(customer_id: int, returned: bool, limit: int, cursor: str = None):
+    session = get_session()
+    rental, inventory, film = models["rental"], models["inventory"], models["film"]
+    sort_key = (rental.rental_date, rental.rental_id)
+    
+    q = (
+        session.query(*rental_history_columns())
+        .join(inventory, inventory.inventory_id == rental.inventory_id)
+        .join(film, film.film_id == inventory.film_id)
+        .filter(
+            rental.customer_id == customer_id,
+            rental.return_date.isnot(None) if returned else rental.return_date.is_(None)
+        )
+    )
+    if cursor:
+        q = q.filter(keyset_after(sort_key, decode_cursor(cursor, (parse_datetime, int)), descending=True))
+    
+    rows = q.order_by(rental.rental_date.desc(), rental.rental_id.desc()).limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = encode_cursor([page[-1].rental_date, page[-1].rental_id]) if len(rows) > limit else None
+    
+    return [rental_history_doc(row) for row in page], next_cursor
+
 ''' Return a customer's rental (mark as returned) '''
 def return_customer_rental(rental_id: int):
     session = get_session()
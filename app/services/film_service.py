@@ -1,8 +1,27 @@
-from ..db import get_session, models
-from sqlalchemy import func, or_, case
+from ..db import get_session, models, read_replica
+from ..search_index import film_search_index
+from ..fulltext import fulltext, FullTextQuery, highlight, snippet
+from ..leaderboard import leaderboards
+from ..shared_cache import cached
+from .projections import film_columns
+from .batching import id_chunks
+from .pagination import page_size, encode_cursor, decode_cursor, keyset_after
+from sqlalchemy import func, or_, and_, case, select, union_all, literal
 
-''' Return top 5 rented films of all time '''
+# Score a film earns for each field the search term matches; a title match is further scaled by TITLE_MATCH_SCALE
+SEARCH_WEIGHTS = {"title": 10, "actor": 5, "genre": 2}
+
+# Title matches: exact 4x, prefix 3x, suffix 2x, anywhere 1x the title weight
+TITLE_MATCH_SCALE = (4, 3, 2, 1)
+
+''' Return top 5 rented films of all time (cached no longer than a leaderboard poll interval) '''
+@cached(ttl=10, tags=["top_films"])
+@read_replica
 def top_5_rented_films():
+    top = leaderboards.top_films(5)
+    if top is not None:
+        return top
+
     session = get_session()
     film, inventory, rental = models["film"], models["inventory"], models["rental"]
 
@@ -15,48 +34,14 @@ def top_5_rented_films():
         .join(inventory, inventory.film_id == film.film_id)
         .join(rental, rental.inventory_id == inventory.inventory_id)
         .group_by(film.film_id, film.title)
-        .order_by(func.count(rental.rental_id).desc())
+        .order_by(func.count(rental.rental_id).desc(), film.film_id)
         .limit(5)
     ).all()
 
     return [{"film_id": fid, "title": title, "rentals": int(count)} for fid, title, count in q] 
 
-''' Return details for a single film '''
-def film_detail(film_id: int):
-    session = get_session()
-    film, film_actor, actor, film_category, category = models["film"], models["film_actor"], models["actor"], models["film_category"], models["category"]
-    
-    f = session.get(film, film_id)
-    if not f: 
-        return None
-    
-    # Get actors for this film
-    actors_query = (
-        session.query(actor)
-        .join(film_actor, film_actor.actor_id == actor.actor_id)
-        .filter(film_actor.film_id == film_id)
-        .order_by(actor.first_name, actor.last_name)
-    ).all()
-    
-    actors_list = [{
-        "actor_id": a.actor_id,
-        "first_name": a.first_name,
-        "last_name": a.last_name,
-        "full_name": f"{a.first_name} {a.last_name}"
-    } for a in actors_query]
-    
-    # Get category for this film
-    category_query = (
-        session.query(category)
-        .join(film_category, film_category.category_id == category.category_id)
-        .filter(film_category.film_id == film_id)
-    ).first()
-    
-    category_obj = {
-        "category_id": category_query.category_id,
-        "name": category_query.name
-    } if category_query else None
-    
+''' Build the JSON document for a film row (film_columns()) from its already-loaded actors and category (dates and decimals are encoded by the JSON provider) '''
+def _format_film(f, actors_list, category_obj):
     return {
         "film_id": f.film_id,
         "title": f.title,
@@ -65,18 +50,83 @@ def film_detail(film_id: int):
         "language_id": f.language_id,
         "original_language_id": f.original_language_id,
         "rental_duration": f.rental_duration,
-        "rental_rate": float(f.rental_rate),
+        "rental_rate": f.rental_rate,
         "length": f.length,
-        "replacement_cost": float(f.replacement_cost),
+        "replacement_cost": f.replacement_cost,
         "rating": f.rating,
         "special_features": list(f.special_features) if f.special_features else [],
-        "last_update": f.last_update.isoformat() if f.last_update else None,
+        "last_update": f.last_update,
         "actors": actors_list,
         "category": category_obj,
     }
-    
+
+''' Return details for many films in three queries, in the same order as film_ids (missing films are skipped) '''
+@read_replica
+def film_details(film_ids):
+    session = get_session()
+    film, film_actor, actor, film_category, category = models["film"], models["film_actor"], models["actor"], models["film_category"], models["category"]
+
+    # Drop duplicates but keep the caller's ordering
+    film_ids = list(dict.fromkeys(film_ids))
+    if not film_ids:
+        return []
+
+    films = {
+        f.film_id: f
+        for f in session.query(*film_columns()).filter(film.film_id.in_(film_ids))
+    }
+
+    # Get actors for all films at once
+    actors_by_film = {}
+    actors_query = (
+        session.query(film_actor.film_id, actor.actor_id, actor.first_name, actor.last_name)
+        .join(actor, actor.actor_id == film_actor.actor_id)
+        .filter(film_actor.film_id.in_(list(films)))
+        .order_by(actor.first_name, actor.last_name)
+    )
+    for fid, aid, first_name, last_name in actors_query:
+        actors_by_film.setdefault(fid, []).append({
+            "actor_id": aid,
+            "first_name": first_name,
+            "last_name": last_name,
+            "full_name": f"{first_name} {last_name}"
+        })
+
+    # Get the category for all films at once (first one wins, like film_detail used to)
+    category_by_film = {}
+    category_query = (
+        session.query(film_category.film_id, category.category_id, category.name)
+        .join(category, category.category_id == film_category.category_id)
+        .filter(film_category.film_id.in_(list(films)))
+    )
+    for fid, cid, name in category_query:
+        category_by_film.setdefault(fid, {"category_id": cid, "name": name})
+
+    return [
+        _format_film(films[fid], actors_by_film.get(fid, []), category_by_film.get(fid))
+        for fid in film_ids if fid in films
+    ]
+
+''' Details for many films keyed by film_id, queried in IN-sized chunks (missing films are left out) '''
+def films_by_id(film_ids):
+    found = {}
+    for chunk in id_chunks(film_ids):
+        found.update((doc["film_id"], doc) for doc in film_details(chunk))
+    return found
+
+''' Return details for a single film '''
+@cached(tags=lambda film_id: [f"film:{film_id}"])
+def film_detail(film_id: int):
+    docs = film_details([film_id])
+    return docs[0] if docs else None
+
 ''' Search films by film title '''
+@read_replica
 def search_films_by_title(search_term: str):
+    film_ids = film_search_index.search_titles(search_term)
+    if film_ids is not None:
+        return film_details(film_ids)
+
     session = get_session()
     film, film_text = models["film"], models["film_text"]
     
@@ -89,20 +139,66 @@ def search_films_by_title(search_term: str):
     )
     
     q = (
-        session.query(film, ranking.label('rank'))
+        session.query(film.film_id, ranking.label('rank'))
         .join(film_text, film.film_id == film_text.film_id)
         .filter(film_text.title.ilike(f"%{search_term}%"))
         .order_by(ranking, film_text.title)
     ).all()
     
-    return [film_detail(f.film_id) for f, rank in q if film_detail(f.film_id) is not None]
+    return film_details([fid for fid, rank in q])
+
+'''
+    Full-text search over film titles and descriptions (natural-language or MySQL-style boolean mode), best matches first.
+    Uses the database's full-text index when there is one (see fulltext.py) and ilike otherwise; each film carries
+    its relevance score and highlighted title and description snippet. Keyset-paginated by (score, film_id).
+'''
+@read_replica
+def fulltext_search_films(search_term: str, mode: str = "natural", limit: int = None, cursor: str = None):
+    session = get_session()
+    limit = page_size(limit)
+    if mode not in ("natural", "boolean"):
+        return {"error": "mode must be natural or boolean"}, 400
+    query = FullTextQuery(search_term, mode)
+    if not query.positive:
+        return {"error": "Search term has no words to match"}, 400
+
+    backend = fulltext.backend()
+    matches = backend.matches(query).subquery()
+    q = session.query(matches)
+    if cursor:
+        try:
+            score, film_id = decode_cursor(cursor, (float, int))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        # Score descends, then id ascends
+        q = q.filter(or_(matches.c.score < score, and_(matches.c.score == score, matches.c.film_id > film_id)))
+
+    rows = q.order_by(matches.c.score.desc(), matches.c.film_id).limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = encode_cursor([float(page[-1].score), page[-1].film_id]) if len(rows) > limit else None
+
+    matched = {row.film_id: row for row in page}
+    films = film_details(list(matched))
+    for doc in films:
+        row = matched[doc["film_id"]]
+        doc["score"] = round(float(row.score), 6)
+        if backend.highlights:
+            doc["highlights"] = {"title": row.title, "description": row.description}
+        else:
+            doc["highlights"] = {"title": highlight(row.title, query.words), "description": snippet(row.description, query.words)}
+    return {"films": films, "backend": backend.name, "next": next_cursor}, 200
 
 ''' Search films by actor name '''
+@read_replica
 def search_films_by_actor(search_term: str):
+    film_ids = film_search_index.search_actors(search_term)
+    if film_ids is not None:
+        return film_details(film_ids)
+
     session = get_session()
     film, film_actor, actor = models["film"], models["film_actor"], models["actor"]
     q = (
-        session.query(film)
+        session.query(film.film_id)
         .join(film_actor, film_actor.film_id == film.film_id)
         .join(actor, actor.actor_id == film_actor.actor_id)
         .filter(
@@ -113,18 +209,111 @@ def search_films_by_actor(search_term: str):
             )
         ).distinct()
     ).all()
-    return [film_detail(f.film_id) for f in q if film_detail(f.film_id) is not None]
+    return film_details([fid for fid, in q])
 
 ''' Search films by genre '''
+@read_replica
 def search_films_by_genre(search_term: str):
+    film_ids = film_search_index.search_genres(search_term)
+    if film_ids is not None:
+        return film_details(film_ids)
+
     session = get_session()
     film, film_category, category = models["film"], models["film_category"], models["category"]
     q = (
-        session.query(film)
+        session.query(film.film_id)
         .join(film_category, film_category.film_id == film.film_id)
         .join(category, category.category_id == film_category.category_id)
         .filter(category.name.ilike(f"%{search_term}%"))
         .distinct()
     ).all()
-    return [film_detail(f.film_id) for f in q if film_detail(f.film_id) is not None]
-    
\ No newline at end of file
+    return film_details([fid for fid, in q])
+    
+'''
+    Ranked search over titles, actor names and genres, optionally restricted to some of those fields.
+    Matching, scoring (sum of SEARCH_WEIGHTS over the fields that match, a title match scaled by its quality),
+    dedup, ordering and keyset paging all run as one statement; only the returned page of films is hydrated.
+'''
+@read_replica
+def search_films(search_term: str, fields=None, limit: int = None, cursor: str = None):
+    session = get_session()
+    film = models["film"]
+    limit = page_size(limit)
+    fields = list(dict.fromkeys(fields or SEARCH_WEIGHTS))
+    unknown = [f for f in fields if f not in SEARCH_WEIGHTS]
+    if unknown:
+        return {"error": f"Unknown search fields: {', '.join(unknown)}"}, 400
+
+    matches = union_all(*[_search_branch(field, search_term) for field in fields]).subquery()
+    scores = (
+        select(matches.c.film_id, func.sum(matches.c.score).label("score"))
+        .group_by(matches.c.film_id)
+        .subquery()
+    )
+
+    q = (
+        session.query(film.film_id, film.title, scores.c.score)
+        .join(scores, scores.c.film_id == film.film_id)
+    )
+    if cursor:
+        try:
+            score, title, film_id = decode_cursor(cursor, (int, str, int))
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        # Score descends, then title and id ascend
+        q = q.filter(or_(
+            scores.c.score < score,
+            and_(scores.c.score == score, keyset_after((film.title, film.film_id), (title, film_id)))
+        ))
+
+    rows = q.order_by(scores.c.score.desc(), film.title, film.film_id).limit(limit + 1).all()
+    page = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor([int(last.score), last.title, last.film_id])
+
+    score_by_film = {row.film_id: int(row.score) for row in page}
+    films = film_details([row.film_id for row in page])
+    for doc in films:
+        doc["score"] = score_by_film[doc["film_id"]]
+    return {"films": films, "next": next_cursor}, 200
+
+''' SELECT film_id, score for the films whose field matches the term, one row per film '''
+def _search_branch(field: str, search_term: str):
+    weight = SEARCH_WEIGHTS[field]
+    if field == "title":
+        film_text = models["film_text"]
+        exact, prefix, suffix, anywhere = (weight * scale for scale in TITLE_MATCH_SCALE)
+        score = case(
+            (func.lower(film_text.title) == search_term.lower(), exact),
+            (film_text.title.istartswith(search_term, autoescape=True), prefix),
+            (film_text.title.iendswith(search_term, autoescape=True), suffix),
+            else_=anywhere
+        )
+        return (
+            select(film_text.film_id.label("film_id"), score.label("score"))
+            .where(film_text.title.icontains(search_term, autoescape=True))
+        )
+
+    if field == "actor":
+        film_actor, actor = models["film_actor"], models["actor"]
+        return (
+            select(film_actor.film_id.label("film_id"), literal(weight).label("score"))
+            .join(actor, actor.actor_id == film_actor.actor_id)
+            .where(or_(
+                actor.first_name.icontains(search_term, autoescape=True),
+                actor.last_name.icontains(search_term, autoescape=True),
+                (actor.first_name + " " + actor.last_name).icontains(search_term, autoescape=True)
+            ))
+            .distinct()
+        )
+
+    film_category, category = models["film_category"], models["category"]
+    return (
+        select(film_category.film_id.label("film_id"), literal(weight).label("score"))
+        .join(category, category.category_id == film_category.category_id)
+        .where(category.name.icontains(search_term, autoescape=True))
+        .distinct()
+    )
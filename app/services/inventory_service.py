@@ -0,0 +1,62 @@
+from ..db import get_session, models
+from sqlalchemy import exists
+
+''' Whether the connected database understands FOR UPDATE SKIP LOCKED '''
+def _supports_skip_locked(dialect):
+    version = dialect.server_version_info or ()
+    if dialect.name == "mysql":
+        if getattr(dialect, "is_mariadb", False):
+            return version >= (10, 6)
+        return version >= (8, 0, 1)
+    return dialect.name in ("postgresql", "oracle")
+
+'''
+    Claim up to count free copies of a film at a store for the current transaction and return their inventory_ids.
+    The chosen inventory rows stay locked until the caller commits or rolls back, so two concurrent checkouts
+    never get the same copy. With SKIP LOCKED the second checkout moves straight on to the next free copy instead of waiting.
+    "Free" means no open rental (return_date IS NULL), checked per copy through rental's inventory_id index,
+    so the cost depends on the film's copies rather than on the whole rental history.
+    The NOT EXISTS filter is a snapshot read, which under REPEATABLE READ can miss a rental committed since the transaction
+    began; so once the copies are locked their open rentals are re-read with a locking (current) read, and copies that
+    turn out to be taken are dropped and replaced.
+'''
+def claim_copies(film_id: int, store_id: int, count: int = 1):
+    session = get_session()
+    inventory, rental = models["inventory"], models["rental"]
+
+    open_rental = exists().where(
+        rental.inventory_id == inventory.inventory_id,
+        rental.return_date.is_(None)
+    )
+    # SQLite has no row locks (writers are serialized by the database lock), so FOR UPDATE is simply not rendered there
+    skip_locked = _supports_skip_locked(session.get_bind().dialect)
+
+    claimed, checked = [], set()
+    while len(claimed) < count:
+        q = (
+            session.query(inventory.inventory_id)
+            .filter(inventory.film_id == film_id, inventory.store_id == store_id, ~open_rental)
+        )
+        if checked:
+            q = q.filter(inventory.inventory_id.notin_(checked))
+        candidates = [
+            inventory_id for inventory_id, in
+            q.order_by(inventory.inventory_id).limit(count - len(claimed)).with_for_update(skip_locked=skip_locked)
+        ]
+        if not candidates:
+            break
+        taken = {
+            inventory_id for inventory_id, in
+            session.query(rental.inventory_id)
+            .filter(rental.inventory_id.in_(candidates), rental.return_date.is_(None))
+            .with_for_update()
+        }
+        claimed += [inventory_id for inventory_id in candidates if inventory_id not in taken]
+        checked.update(candidates)
+
+    return claimed
+
+''' Claim one free copy of a film at a store (see claim_copies); None if none is free '''
+def allocate_inventory(film_id: int, store_id: int):
+    copies = claim_copies(film_id, store_id, 1)
+    return copies[0] if copies else None
@@ -0,0 +1,47 @@
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+''' Clamp a requested page size into [1, MAX_PAGE_SIZE] '''
+def page_size(limit):
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+''' Encode the sort-key values of the last row on a page as an opaque cursor '''
+def encode_cursor(values):
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+''' Decode a cursor back into sort-key values, converting each with the matching type (raises ValueError) '''
+def decode_cursor(cursor: str, types):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return [convert(v) for convert, v in zip(types, values)]
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+''' Parse an ISO timestamp stored in a cursor '''
+def parse_datetime(value):
+    return datetime.fromisoformat(value)
+
+'''
+    WHERE clause selecting the rows that come strictly after values in (columns) order.
+    Written out as (a > x) OR (a = x AND b > y) OR ... so every dialect can use the index.
+'''
+def keyset_after(columns, values, descending=False):
+    clauses = []
+    for i, (col, val) in enumerate(zip(columns, values)):
+        step = col < val if descending else col > val
+        clauses.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], step))
+    return or_(*clauses)
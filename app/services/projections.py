@@ -0,0 +1,58 @@
+from ..db import models
+
+'''
+    Column projections for the read paths that return many rows.
+    Each projection selects just the columns a response uses, as plain Rows (no entities, no identity map),
+    and turns a Row into its response dict with a serializer built once at import: fixed key tuples zipped over row slices.
+'''
+
+CUSTOMER_KEYS = ("customer_id", "first_name", "last_name", "email", "store_id", "address_id", "active", "create_date", "last_update")
+ADDRESS_KEYS = ("address_id", "address", "address2", "district", "city_id", "postal_code", "phone")
+
+_CUSTOMER_END = len(CUSTOMER_KEYS)
+_ADDRESS_END = _CUSTOMER_END + len(ADDRESS_KEYS)
+
+''' Columns for customer_doc(): the customer's columns, then its address's (outer-joined, so possibly all None) '''
+def customer_columns():
+    customer, address = models["customer"], models["address"]
+    return (
+        [getattr(customer, key) for key in CUSTOMER_KEYS]
+        + [getattr(address, key).label(f"address_{key}") for key in ADDRESS_KEYS]
+    )
+
+''' Outer join from customer to its address, for queries selecting customer_columns() '''
+def customer_address_join():
+    customer, address = models["customer"], models["address"]
+    return address, address.address_id == customer.address_id
+
+''' Customer response dict from a row starting with customer_columns() (dates are encoded by the JSON provider) '''
+def customer_doc(row):
+    doc = dict(zip(CUSTOMER_KEYS, row[:_CUSTOMER_END]))
+    doc["address"] = dict(zip(ADDRESS_KEYS, row[_CUSTOMER_END:_ADDRESS_END])) if row[_CUSTOMER_END] is not None else None
+    return doc
+
+FILM_KEYS = (
+    "film_id", "title", "description", "release_year", "language_id", "original_language_id",
+    "rental_duration", "rental_rate", "length", "replacement_cost", "rating", "special_features", "last_update",
+)
+
+''' The film columns a film document shows '''
+def film_columns():
+    film = models["film"]
+    return [getattr(film, key) for key in FILM_KEYS]
+
+RENTAL_HISTORY_KEYS = ("rental_id", "rental_date", "return_date", "inventory_id", "film_id", "film_title", "rental_rate")
+
+''' Columns for rental_history_doc(); callers join inventory and film '''
+def rental_history_columns():
+    rental, film = models["rental"], models["film"]
+    return [
+        rental.rental_id, rental.rental_date, rental.return_date, rental.inventory_id,
+        film.film_id, film.title.label("film_title"), film.rental_rate,
+    ]
+
+''' Rental history entry from a rental_history_columns() row '''
+def rental_history_doc(row):
+    doc = dict(zip(RENTAL_HISTORY_KEYS, row))
+    doc["is_returned"] = row[2] is not None
+    return doc
@@ -1,11 +1,39 @@
-from ..db import get_session, models
+from ..db import get_session, models, read_replica
+from ..leaderboard import leaderboards
+from .batching import id_chunks
+from .inventory_service import allocate_inventory, claim_copies
 from datetime import datetime, timedelta
-from sqlalchemy import and_
+from sqlalchemy import DateTime, insert, update
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+# Largest number of films or rentals accepted by one bulk request
+MAX_BULK_ITEMS = 100
+
+# Rows fetched per server-side cursor round trip when streaming overdue rentals
+OVERDUE_CHUNK_SIZE = 1000
+
+
+class add_days(FunctionElement):
+    ''' add_days(datetime, days) in SQL: DATE_ADD on MySQL, datetime() modifiers on SQLite '''
+    type = DateTime()
+    name = "add_days"
+    inherit_cache = True
+
+@compiles(add_days)
+def _add_days_mysql(element, compiler, **kw):
+    value, days = list(element.clauses)
+    return f"DATE_ADD({compiler.process(value, **kw)}, INTERVAL {compiler.process(days, **kw)} DAY)"
+
+@compiles(add_days, "sqlite")
+def _add_days_sqlite(element, compiler, **kw):
+    value, days = list(element.clauses)
+    return f"datetime({compiler.process(value, **kw)}, '+' || {compiler.process(days, **kw)} || ' days')"
 
 ''' Create a new rental for a customer '''
 def create_rental(customer_id: int, film_id: int, staff_id: int):
     session = get_session()
-    rental, inventory, customer, film = models["rental"], models["inventory"], models["customer"], models["film"]
+    rental, customer, film = models["rental"], models["customer"], models["film"]
     
     # Check if customer exists
     customer_obj = session.get(customer, customer_id)
@@ -16,22 +44,12 @@ def create_rental(customer_id: int, film_id: int, staff_id: int):
     film_obj = session.get(film, film_id)
     if not film_obj:
         return {"error": "Film not found"}, 404
-    pass
-
-    # Find available inventory for this film
-    available_inventory = (
-        session.query(inventory)
-        .filter(inventory.film_id == film_id)
-        .outerjoin(rental, and_(
-            rental.inventory_id == inventory.inventory_id,
-            rental.return_date.is_(None) 
-        ))
-        .filter(rental.rental_id.is_(None))  
-        .first()
-    )
-    
-    if not available_inventory:
-        return {"error": "Film is not available for rental"}, 400
+
+    # Claim a free copy at the customer's store (locked until commit)
+    inventory_id = allocate_inventory(film_id, customer_obj.store_id)
+    if inventory_id is None:
+        session.rollback()
+        return {"error": "Film is not available for rental at this store"}, 400
     
     # Calculate rental date and return date
     rental_date = datetime.now()
@@ -40,7 +58,7 @@ def create_rental(customer_id: int, film_id: int, staff_id: int):
     # Create new rental record
     new_rental = rental(
         rental_date=rental_date,
-        inventory_id=available_inventory.inventory_id,
+        inventory_id=inventory_id,
         customer_id=customer_id,
         staff_id=staff_id,
         last_update=rental_date
@@ -48,47 +66,183 @@ def create_rental(customer_id: int, film_id: int, staff_id: int):
     try:
         session.add(new_rental)
         session.commit()
-        return get_rental_details(new_rental.rental_id)
+        leaderboards.record_rental(new_rental.rental_id, film_id)
+        result, status_code = get_rental_details(new_rental.rental_id)
+        return result, 201 if status_code == 200 else status_code
     except Exception as e:
         session.rollback()
         return {"error": f"Failed to create rental: {str(e)}"}, 500
 
 ''' Get rental details '''
 def get_rental_details(rental_id: int):
+    rental = rentals_by_id([rental_id]).get(rental_id)
+    if rental is None:
+        return {"error": "Rental not found"}, 404
+    return rental, 200
+
+''' Details for many rentals keyed by rental_id, one IN query per chunk (missing rentals are left out) '''
+@read_replica
+def rentals_by_id(rental_ids):
     session = get_session()
     rental, customer, inventory, film = models["rental"], models["customer"], models["inventory"], models["film"]
-    
-    rental_obj = (
-        session.query(rental, customer, film)
-        .join(customer, customer.customer_id == rental.customer_id)
+    found = {}
+    for chunk in id_chunks(rental_ids):
+        # Only the columns _format_rental reads; each row stands in for both the customer and the film
+        rows = (
+            session.query(
+                rental.rental_id, rental.rental_date, rental.return_date, rental.inventory_id,
+                customer.customer_id, customer.first_name, customer.last_name,
+                film.film_id, film.title, film.rental_rate, film.rental_duration
+            )
+            .join(customer, customer.customer_id == rental.customer_id)
+            .join(inventory, inventory.inventory_id == rental.inventory_id)
+            .join(film, film.film_id == inventory.film_id)
+            .filter(rental.rental_id.in_(chunk))
+        )
+        for r in rows:
+            found[r.rental_id] = _format_rental(r.rental_id, r.rental_date, r.return_date, r.inventory_id, r, r)
+    return found
+
+'''
+    Open rentals (return_date IS NULL) that are at least min_days_overdue days past their due date
+    (rental_date + film.rental_duration, compared in SQL) as of as_of, optionally only copies held by store_id.
+    Yields one dict per rental in rental_id order, reading through a server-side cursor so memory stays flat
+    however many rentals match.
+'''
+@read_replica
+def overdue_rentals(store_id: int = None, min_days_overdue: int = 0, as_of: datetime = None, chunk_size: int = OVERDUE_CHUNK_SIZE):
+    session = get_session()
+    rental, customer, inventory, film = models["rental"], models["customer"], models["inventory"], models["film"]
+    as_of = as_of or datetime.now().replace(microsecond=0)
+    due_date = add_days(rental.rental_date, film.rental_duration)
+
+    q = (
+        session.query(
+            rental.rental_id, rental.rental_date, rental.inventory_id, inventory.store_id,
+            customer.customer_id, customer.first_name, customer.last_name, customer.email,
+            film.film_id, film.title, film.rental_duration, film.replacement_cost
+        )
         .join(inventory, inventory.inventory_id == rental.inventory_id)
         .join(film, film.film_id == inventory.film_id)
-        .filter(rental.rental_id == rental_id)
-        .first()
+        .join(customer, customer.customer_id == rental.customer_id)
+        .filter(rental.return_date.is_(None), due_date < as_of - timedelta(days=min_days_overdue))
     )
-    
-    if not rental_obj:
-        return {"error": "Rental not found"}, 404
-    
-    r, c, f = rental_obj
-    
+    if store_id is not None:
+        q = q.filter(inventory.store_id == store_id)
+
+    for r in q.order_by(rental.rental_id).yield_per(chunk_size):
+        due = r.rental_date + timedelta(days=r.rental_duration)
+        yield {
+            "rental_id": r.rental_id,
+            "rental_date": r.rental_date,
+            "due_date": due,
+            "days_overdue": (as_of - due).days,
+            "store_id": r.store_id,
+            "inventory_id": r.inventory_id,
+            "customer_id": r.customer_id,
+            "customer_name": f"{r.first_name} {r.last_name}",
+            "email": r.email,
+            "film_id": r.film_id,
+            "film_title": r.title,
+            "replacement_cost": r.replacement_cost
+        }
+
+''' Build the rental JSON from the rental's own fields plus its customer and film '''
+def _format_rental(rental_id, rental_date, return_date, inventory_id, c, f):
     # Calculate expected return date
-    expected_return_date = r.rental_date + timedelta(days=f.rental_duration)
+    expected_return_date = rental_date + timedelta(days=f.rental_duration)
     
     return {
-        "rental_id": r.rental_id,
+        "rental_id": rental_id,
         "customer_id": c.customer_id,
         "customer_name": f"{c.first_name} {c.last_name}",
         "film_id": f.film_id,
         "film_title": f.title,
-        "rental_date": r.rental_date.isoformat(),
-        "return_date": r.return_date.isoformat() if r.return_date else None,
+        "rental_date": rental_date.isoformat(),
+        "return_date": return_date.isoformat() if return_date else None,
         "expected_return_date": expected_return_date.isoformat(),
         "rental_rate": float(f.rental_rate),
         "rental_duration_days": f.rental_duration,
-        "is_returned": r.return_date is not None,
-        "inventory_id": r.inventory_id
-    }, 201
+        "is_returned": return_date is not None,
+        "inventory_id": inventory_id
+    }
+
+'''
+    Rent several films to one customer in a single transaction.
+    Copies are claimed per film (locked), all rentals go in as one multi-row INSERT, and there is one commit.
+    Returns per-film results in request order; films that are missing or out of stock do not block the others.
+'''
+def create_rentals(customer_id: int, film_ids: list, staff_id: int):
+    session = get_session()
+    rental, customer, film = models["rental"], models["customer"], models["film"]
+
+    customer_obj = session.get(customer, customer_id)
+    if not customer_obj:
+        return {"error": "Customer not found"}, 404
+
+    films = {f.film_id: f for f in session.query(film).filter(film.film_id.in_(set(film_ids)))}
+
+    # Claim as many copies of each film as were asked for, one locked query per distinct film
+    wanted = {}
+    for film_id in film_ids:
+        if film_id in films:
+            wanted[film_id] = wanted.get(film_id, 0) + 1
+    copies = {film_id: claim_copies(film_id, customer_obj.store_id, count) for film_id, count in wanted.items()}
+
+    # MySQL stores DATETIME to the second; truncate so the rows can be read back by rental_date
+    rental_date = datetime.now().replace(microsecond=0)
+    results = []
+    new_rows = []
+    for film_id in film_ids:
+        if film_id not in films:
+            results.append({"film_id": film_id, "status": 404, "error": "Film not found"})
+        elif not copies[film_id]:
+            results.append({"film_id": film_id, "status": 400, "error": "Film is not available for rental at this store"})
+        else:
+            inventory_id = copies[film_id].pop(0)
+            results.append({"film_id": film_id, "status": 201, "inventory_id": inventory_id})
+            new_rows.append({
+                "rental_date": rental_date,
+                "inventory_id": inventory_id,
+                "customer_id": customer_id,
+                "staff_id": staff_id,
+                "last_update": rental_date
+            })
+
+    if not new_rows:
+        session.rollback()
+        return {"customer_id": customer_id, "results": results, "rented": 0, "failed": len(results)}, 400
+
+    try:
+        session.execute(insert(rental.__table__).values(new_rows))
+        # (rental_date, inventory_id, customer_id) is unique in Sakila, so this finds exactly the rows just inserted
+        rental_ids = dict(
+            session.query(rental.inventory_id, rental.rental_id)
+            .filter(
+                rental.customer_id == customer_id,
+                rental.rental_date == rental_date,
+                rental.inventory_id.in_([row["inventory_id"] for row in new_rows])
+            )
+        )
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        return {"error": f"Failed to create rentals: {str(e)}"}, 500
+
+    for result in results:
+        if result["status"] == 201:
+            inventory_id = result.pop("inventory_id")
+            rental_id = rental_ids[inventory_id]
+            leaderboards.record_rental(rental_id, result["film_id"])
+            result["rental"] = _format_rental(rental_id, rental_date, None, inventory_id, customer_obj, films[result["film_id"]])
+
+    rented = len(new_rows)
+    return {
+        "customer_id": customer_id,
+        "results": results,
+        "rented": rented,
+        "failed": len(results) - rented
+    }, 201 if rented == len(results) else 207
 
 ''' Return a rented film '''
 def return_rental(rental_id: int):
@@ -118,4 +272,52 @@ def return_rental(rental_id: int):
         }, 200
     except Exception as e:
         session.rollback()
-        return {"error": f"Failed to return rental: {str(e)}"}, 500
\ No newline at end of file
+        return {"error": f"Failed to return rental: {str(e)}"}, 500
+
+'''
+    Return several rentals in a single transaction: one locked SELECT to classify them, one UPDATE, one commit.
+    Returns per-rental results in request order.
+'''
+def return_rentals(rental_ids: list):
+    session = get_session()
+    rental = models["rental"]
+
+    found = dict(
+        session.query(rental.rental_id, rental.return_date)
+        .filter(rental.rental_id.in_(set(rental_ids)))
+        .with_for_update()
+    )
+
+    return_date = datetime.now()
+    results = []
+    to_return = set()
+    for rental_id in rental_ids:
+        if rental_id not in found:
+            results.append({"rental_id": rental_id, "status": 404, "error": "Rental not found"})
+        elif found[rental_id] is not None or rental_id in to_return:
+            results.append({"rental_id": rental_id, "status": 400, "error": "Film has already been returned"})
+        else:
+            to_return.add(rental_id)
+            results.append({"rental_id": rental_id, "status": 200, "return_date": return_date.isoformat(), "message": "Film returned successfully"})
+
+    if not to_return:
+        session.rollback()
+        return {"results": results, "returned": 0, "failed": len(results)}, 400
+
+    try:
+        session.execute(
+            update(rental.__table__)
+            .where(rental.rental_id.in_(to_return), rental.return_date.is_(None))
+            .values(return_date=return_date, last_update=return_date)
+        )
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        return {"error": f"Failed to return rentals: {str(e)}"}, 500
+
+    returned = len(to_return)
+    return {
+        "results": results,
+        "returned": returned,
+        "failed": len(results) - returned
+    }, 200 if returned == len(results) else 207
@@ -0,0 +1,153 @@
+from ..data_versions import data_versions
+from ..db import get_session, models, read_replica
+from ..leaderboard import leaderboards
+from ..search_index import film_search_index
+from datetime import datetime
+from sqlalchemy import func, select
+
+'''
+    Cheap version probes for conditional GETs.
+    Each probe runs one statement of scalar subqueries over last_update (plus row counts, so deletes are noticed)
+    and returns (version, last_modified), or None when the resource doesn't exist so the view can answer 404 itself.
+    Responses served from an in-memory cache that lags the database (leaderboards, search index) also carry that cache's
+    applied version, so the ETag can never claim a newer state than the body it labels.
+'''
+
+''' Run scalar subqueries in one round trip; last_modified is the newest datetime among them '''
+@read_replica
+def _probe(*columns):
+    session = get_session()
+    return probed_row(tuple(session.execute(select(*columns)).one()))
+
+''' (version, last_modified) from a probe's result row (shared with async_version_service) '''
+def probed_row(row):
+    timestamps = [value for value in row if isinstance(value, datetime)]
+    return row, max(timestamps) if timestamps else None
+
+'''
+    Add an in-memory cache's applied version to a probe. Last-Modified is dropped: the database's newest last_update
+    says nothing about what the cache has applied, so only the ETag validates these responses.
+'''
+def _with_cache_version(probed, cache):
+    version, last_modified = probed
+    return version + (cache.version(),), None
+
+''' Row count and newest last_update of whole tables '''
+def _table_columns(*tables):
+    columns = []
+    for table in tables:
+        t = models[table]
+        columns.append(select(func.count()).select_from(t).scalar_subquery())
+        columns.append(select(func.max(t.last_update)).scalar_subquery())
+    return columns
+
+''' Newest rental id: rentals only ever get appended, so this versions anything counting rentals '''
+def _latest_rental():
+    rental = models["rental"]
+    return select(func.max(rental.rental_id)).scalar_subquery()
+
+''' Row counts and newest last_update of the catalog tables '''
+def catalog_columns():
+    return _table_columns("film", "actor", "category", "film_actor", "film_category")
+
+def catalog_version(**kwargs):
+    return _probe(*catalog_columns())
+
+''' For the title/actor/genre searches, which the in-memory search index answers when it is built '''
+def search_index_version(**kwargs):
+    return _with_cache_version(catalog_version(), film_search_index)
+
+def top_films_version(**kwargs):
+    return _with_cache_version(_probe(_latest_rental(), *_table_columns("film")), leaderboards)
+
+def top_actors_version(**kwargs):
+    return _with_cache_version(_probe(*_table_columns("actor", "film_actor", "inventory")), leaderboards)
+
+def actor_top_films_version(actor_id: int, **kwargs):
+    film_actor = models["film_actor"]
+    return _with_cache_version(_probe(
+        _latest_rental(),
+        select(func.count()).select_from(film_actor).where(film_actor.actor_id == actor_id).scalar_subquery(),
+        select(func.max(film_actor.last_update)).where(film_actor.actor_id == actor_id).scalar_subquery(),
+        *_table_columns("film")
+    ), leaderboards)
+
+''' The film row and everything film details embed: its actors and category '''
+def film_columns(film_id: int):
+    film, film_actor, actor, film_category, category = models["film"], models["film_actor"], models["actor"], models["film_category"], models["category"]
+    return [
+        select(film.last_update).where(film.film_id == film_id).scalar_subquery(),
+        select(func.count()).select_from(film_actor).where(film_actor.film_id == film_id).scalar_subquery(),
+        select(func.max(film_actor.last_update)).where(film_actor.film_id == film_id).scalar_subquery(),
+        select(func.max(actor.last_update))
+            .join(film_actor, film_actor.actor_id == actor.actor_id)
+            .where(film_actor.film_id == film_id).scalar_subquery(),
+        select(func.count()).select_from(film_category).where(film_category.film_id == film_id).scalar_subquery(),
+        select(func.max(film_category.last_update)).where(film_category.film_id == film_id).scalar_subquery(),
+        select(func.max(category.last_update))
+            .join(film_category, film_category.category_id == category.category_id)
+            .where(film_category.film_id == film_id).scalar_subquery(),
+    ]
+
+def film_version(film_id: int, **kwargs):
+    return found(_probe(*film_columns(film_id)))
+
+def actor_columns(actor_id: int):
+    actor = models["actor"]
+    return [select(actor.last_update).where(actor.actor_id == actor_id).scalar_subquery()]
+
+def actor_version(actor_id: int, **kwargs):
+    return found(_probe(*actor_columns(actor_id)))
+
+''' A probe whose first column is the resource's own row, or None when that row doesn't exist '''
+def found(probed):
+    version, last_modified = probed
+    return (version, last_modified) if version[0] is not None else None
+
+'''
+    For the customer list and search: the customers counter (bumped by every customer write the app makes) plus
+    MAX(customer_id) from the primary key, so rows inserted behind the app's back are noticed too.
+    Without the counter table this falls back to scanning customer and address.
+'''
+def customers_version(**kwargs):
+    if not data_versions.enabled:
+        return _probe(*_table_columns("customer", "address"))
+    customer = models["customer"]
+    return _probe(*data_versions.columns("customers"), select(func.max(customer.customer_id)).scalar_subquery())
+
+''' The customer row and its address row '''
+def _customer_columns(customer_id: int):
+    customer, address = models["customer"], models["address"]
+    return [
+        select(customer.last_update).where(customer.customer_id == customer_id).scalar_subquery(),
+        select(address.last_update)
+            .join(customer, customer.address_id == address.address_id)
+            .where(customer.customer_id == customer_id).scalar_subquery(),
+    ]
+
+def customer_version(customer_id: int, **kwargs):
+    version, last_modified = _probe(*_customer_columns(customer_id))
+    return (version, last_modified) if version[0] is not None else None
+
+def customer_rentals_version(customer_id: int, **kwargs):
+    rental = models["rental"]
+    version, last_modified = _probe(
+        *_customer_columns(customer_id),
+        select(func.count()).select_from(rental).where(rental.customer_id == customer_id).scalar_subquery(),
+        select(func.max(rental.last_update)).where(rental.customer_id == customer_id).scalar_subquery(),
+    )
+    return (version, last_modified) if version[0] is not None else None
+
+def rental_version(rental_id: int, **kwargs):
+    rental, customer, inventory, film = models["rental"], models["customer"], models["inventory"], models["film"]
+    version, last_modified = _probe(
+        select(rental.last_update).where(rental.rental_id == rental_id).scalar_subquery(),
+        select(customer.last_update)
+            .join(rental, rental.customer_id == customer.customer_id)
+            .where(rental.rental_id == rental_id).scalar_subquery(),
+        select(film.last_update)
+            .join(inventory, inventory.film_id == film.film_id)
+            .join(rental, rental.inventory_id == inventory.inventory_id)
+            .where(rental.rental_id == rental_id).scalar_subquery(),
+    )
+    return (version, last_modified) if version[0] is not None else None
@@ -0,0 +1,372 @@
+import hashlib
+import json
+import os
+import sqlite3
+import stat
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+import click
+from flask import current_app, g, has_request_context
+from .json_provider import dumps_bytes
+
+# Only move an entry up the LRU order when its last recorded access is older than this, so most hits stay read-only
+LRU_RESOLUTION_SECONDS = 1.0
+
+# Evict down to this share of max_bytes once the cache is over budget, so every set doesn't evict
+EVICT_TO = 0.9
+
+# Per-process hit/miss counters are added to the shared totals at most this often
+STATS_FLUSH_SECONDS = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS tags (
+    tag TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (tag, key)
+);
+CREATE INDEX IF NOT EXISTS tags_key ON tags (key);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO usage (id, bytes) SELECT 1, total(size) FROM entries;
+CREATE TRIGGER IF NOT EXISTS entries_usage_insert AFTER INSERT ON entries BEGIN
+    UPDATE usage SET bytes = bytes + new.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_usage_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE usage SET bytes = bytes + new.size - old.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_usage_delete AFTER DELETE ON entries BEGIN
+    UPDATE usage SET bytes = bytes - old.size WHERE id = 1;
+END;
+"""
+
+
+class SharedCache:
+    '''
+        Cache shared by every worker on the host, stored in a SQLite file (WAL mode, so readers don't block each other).
+        Values are stored as JSON (as the API would serve them), entries carry a TTL and tags, and the least recently
+        used ones are evicted once the values exceed max_bytes; triggers keep the running total in the usage table.
+        Errors are logged and treated as misses, so a broken cache file never fails a request.
+    '''
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.max_bytes = 64 * 1024 * 1024
+        self.default_ttl = 60
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._pending = Counter()
+        self._last_flush = time.monotonic()
+
+    def configure(self, path: str, max_bytes: int, default_ttl: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._conn().executescript(_SCHEMA)
+        self.enabled = True
+
+    ''' One connection per thread, process and path (connections must not cross a fork or outlive a configure()) '''
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid() or self._local.path != self.path:
+            conn = self._local.conn = self._connect()
+            self._local.pid = os.getpid()
+            self._local.path = self.path
+        return conn
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _count(self, name: str, n: int = 1):
+        with self._stats_lock:
+            self._pending[name] += n
+            if time.monotonic() - self._last_flush < STATS_FLUSH_SECONDS:
+                return
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        self._flush_stats(pending)
+
+    def _flush_stats(self, pending):
+        try:
+            self._conn().executemany(
+                "INSERT INTO stats (name, value) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+                list(pending.items())
+            )
+        except sqlite3.Error as e:
+            current_app.logger.warning(f"Shared cache stats flush failed: {str(e)}")
+
+    ''' Return (True, value) on a hit or (False, None) on a miss '''
+    def lookup(self, key: str):
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value, expires_at, accessed_at FROM entries WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is None or row[1] <= now:
+                self._count("misses")
+                return False, None
+            if now - row[2] >= LRU_RESOLUTION_SECONDS:
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            value = json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            current_app.logger.warning(f"Shared cache read failed: {str(e)}")
+            self._count("errors")
+            return False, None
+        self._count("hits")
+        return True, value
+
+    def get(self, key: str, default=None):
+        hit, value = self.lookup(key)
+        return value if hit else default
+
+    def set(self, key: str, value, ttl: float = None, tags=()):
+        blob = dumps_bytes(value)
+        now = time.time()
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # An upsert rather than INSERT OR REPLACE, whose implicit delete would not fire the usage trigger
+                conn.execute(
+                    "INSERT INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                    "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                    (key, blob, len(blob) + len(key), expires_at, now)
+                )
+                conn.execute("DELETE FROM tags WHERE key = ?", (key,))
+                conn.executemany("INSERT OR IGNORE INTO tags (tag, key) VALUES (?, ?)", [(tag, key) for tag in tags])
+                evicted = self._evict(conn, now)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            current_app.logger.warning(f"Shared cache write failed: {str(e)}")
+            self._count("errors")
+            return
+        self._count("sets")
+        if evicted:
+            self._count("evictions", evicted)
+
+    ''' Drop expired entries, then least recently used ones until the values fit in EVICT_TO of max_bytes '''
+    def _evict(self, conn, now):
+        if self._usage(conn) <= self.max_bytes:
+            return 0
+        expired = [k for (k,) in conn.execute("SELECT key FROM entries WHERE expires_at <= ?", (now,))]
+        self._delete(conn, expired)
+        total = self._usage(conn)
+
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            victims.append(key)
+            total -= size
+        self._delete(conn, victims)
+        return len(expired) + len(victims)
+
+    ''' Bytes held by all entries, from the trigger-maintained running total '''
+    def _usage(self, conn):
+        return conn.execute("SELECT bytes FROM usage WHERE id = 1").fetchone()[0]
+
+    def _delete(self, conn, keys):
+        conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in keys])
+        conn.executemany("DELETE FROM tags WHERE key = ?", [(k,) for k in keys])
+
+    ''' Return the cached value, or compute, store and return it '''
+    def get_or_compute(self, key: str, compute, ttl: float = None, tags=(), cache_none: bool = False):
+        if not self.enabled:
+            return compute()
+        hit, value = self.lookup(key)
+        if hit:
+            return value
+        value = compute()
+        if value is not None or cache_none:
+            self.set(key, value, ttl, tags)
+        return value
+
+    ''' Drop every entry carrying any of the tags; returns how many were dropped '''
+    def invalidate(self, *tags):
+        if not self.enabled or not tags:
+            return 0
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                keys = {
+                    k for (k,) in conn.execute(
+                        f"SELECT key FROM tags WHERE tag IN ({','.join('?' * len(tags))})", tags
+                    )
+                }
+                self._delete(conn, keys)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            current_app.logger.warning(f"Shared cache invalidation failed: {str(e)}")
+            return 0
+        self._count("invalidations", len(keys))
+        return len(keys)
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM tags")
+
+    ''' Totals across all workers plus this process's unflushed counts, and the current size; None (logged) when the file can't be read '''
+    def stats(self):
+        with self._stats_lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        if pending:
+            self._flush_stats(pending)
+        try:
+            conn = self._conn()
+            counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            entries = conn.execute("SELECT count(*) FROM entries").fetchone()[0]
+            size = self._usage(conn)
+        except sqlite3.Error as e:
+            current_app.logger.warning(f"Shared cache stats read failed: {str(e)}")
+            self._count("errors")
+            return None
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": int(size),
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            "sets": counters.get("sets", 0),
+            "evictions": counters.get("evictions", 0),
+            "invalidations": counters.get("invalidations", 0),
+            "errors": counters.get("errors", 0),
+        }
+
+
+shared_cache = SharedCache()
+
+# The probed resource version of the current conditional ASGI request (the async counterpart of g.resource_version)
+async_resource_version = ContextVar("resource_version", default=None)
+
+'''
+    Cache a service function's result in the shared cache, keyed by its name and arguments.
+    tags is a list of tags or a function of the same arguments returning one, e.g. lambda film_id: [f"film:{film_id}"].
+    None results are not cached unless cache_none is set.
+    Inside a conditional GET the probed resource version is part of the key, so the body always matches its ETag.
+'''
+def cached(ttl: float = None, tags=(), cache_none: bool = False):
+    def decorator(f):
+        name = f"{f.__module__}.{f.__qualname__}"
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not shared_cache.enabled:
+                return f(*args, **kwargs)
+            key = _cache_key(name, args, kwargs, g.get("resource_version") if has_request_context() else None)
+            entry_tags = tags(*args, **kwargs) if callable(tags) else tags
+            return shared_cache.get_or_compute(key, lambda: f(*args, **kwargs), ttl, entry_tags, cache_none)
+
+        wrapper.cache_settings = (name, ttl, tags, cache_none)
+        return wrapper
+    return decorator
+
+def _cache_key(name: str, args, kwargs, version):
+    key = f"{name}:{args!r}:{sorted(kwargs.items())!r}"
+    if version is not None:
+        key += f":{version!r}"
+    return key
+
+'''
+    Share a @cached sync function's entries with a coroutine function computing the same result, for the ASGI routes:
+    same key, TTL and tags, so either app serves what the other cached. Inside a conditional ASGI GET the probed version
+    comes from async_resource_version rather than g. Needs a Flask app context for error logging.
+'''
+def cached_like(sync_function):
+    name, ttl, tags, cache_none = sync_function.cache_settings
+
+    def decorator(f):
+        @wraps(f)
+        async def wrapper(*args, **kwargs):
+            if not shared_cache.enabled:
+                return await f(*args, **kwargs)
+            key = _cache_key(name, args, kwargs, async_resource_version.get())
+            hit, value = shared_cache.lookup(key)
+            if hit:
+                return value
+            value = await f(*args, **kwargs)
+            if value is not None or cache_none:
+                shared_cache.set(key, value, ttl, tags(*args, **kwargs) if callable(tags) else tags)
+            return value
+        return wrapper
+    return decorator
+
+def init_shared_cache(app):
+    @app.cli.command("cache-stats")
+    def cache_stats():
+        ''' Print shared cache statistics '''
+        if not shared_cache.enabled:
+            raise click.ClickException("Shared cache is disabled")
+        stats = shared_cache.stats()
+        if stats is None:
+            raise click.ClickException("Shared cache stats unavailable, see the log")
+        for name, value in stats.items():
+            click.echo(f"{name}: {value}")
+
+    @app.cli.command("cache-invalidate")
+    @click.argument("tags", nargs=-1, required=True)
+    def cache_invalidate(tags):
+        ''' Drop shared cache entries carrying any of TAGS (e.g. film:123) '''
+        click.echo(f"Dropped {shared_cache.invalidate(*tags)} entries")
+
+    if not app.config.get("SHARED_CACHE_ENABLED"):
+        return
+    path = app.config.get("SHARED_CACHE_PATH")
+    if not path:
+        # One file per database, so apps on different databases never share entries
+        digest = hashlib.sha1(app.config["SQLALCHEMY_DATABASE_URI"].encode()).hexdigest()[:12]
+        path = os.path.join(app.instance_path, "shared-cache", f"sakila-{digest}.sqlite3")
+    try:
+        _check_private(path)
+        shared_cache.configure(path, app.config["SHARED_CACHE_MAX_BYTES"], app.config["SHARED_CACHE_TTL"])
+    except (OSError, sqlite3.Error) as e:
+        # Every cached function computes directly until the cache file is usable
+        app.logger.warning(f"Shared cache unavailable at {path}: {str(e)}")
+
+'''
+    Make sure only this user can write the cache: its directory is created 0700 if missing, and the directory
+    (and the files, if they exist) must be owned by this process's uid and not writable by group or others.
+    Raises PermissionError otherwise, so a file planted by another user is never opened.
+'''
+def _check_private(path: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    for candidate in (directory, path, path + "-wal", path + "-shm"):
+        try:
+            info = os.stat(candidate)
+        except FileNotFoundError:
+            continue
+        if info.st_uid != os.getuid() or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise PermissionError(f"{candidate} must be owned by uid {os.getuid()} and not writable by group or others")
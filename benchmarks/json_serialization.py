@@ -0,0 +1,75 @@
+'''
+    Micro-benchmark: JSON encoding of a customer list the old way vs. through FastJSONProvider, plus compressed sizes.
+    Run with: python -m benchmarks.json_serialization [rows]
+'''
+import gzip
+import sys
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from app.json_provider import FastJSONProvider, orjson
+
+''' Synthetic customer documents with raw datetime values, as the services now build them '''
+def make_customers(n: int):
+    base = datetime(2006, 2, 14, 22, 4, 36)
+    return [{
+        "customer_id": i,
+        "first_name": "MARY",
+        "last_name": f"SMITH{i}",
+        "email": f"customer{i}@sakilacustomer.org",
+        "store_id": 1 + i % 2,
+        "address_id": i + 4,
+        "address": {
+            "address_id": i + 4,
+            "address": f"{i} Main Street",
+            "address2": None,
+            "district": "Alberta",
+            "city_id": 300,
+            "postal_code": "35200",
+            "phone": "14033335568"
+        },
+        "active": 1,
+        "create_date": base - timedelta(days=i % 365),
+        "last_update": base,
+        "balance": Decimal("12.99"),
+    } for i in range(n)]
+
+''' The pre-provider shape: every datetime and Decimal converted in Python before encoding '''
+def preformat(customers):
+    return [{
+        **c,
+        "create_date": c["create_date"].isoformat(),
+        "last_update": c["last_update"].isoformat(),
+        "balance": float(c["balance"]),
+    } for c in customers]
+
+def main(rows: int = 10000, repeat: int = 5):
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+    customers = make_customers(rows)
+
+    def old_path():
+        return default_provider.dumps(preformat(customers), separators=(",", ":")).encode()
+
+    def new_path():
+        return fast_provider._dumps_bytes(customers)
+
+    old_body, new_body = old_path(), new_path()
+    results = [
+        ("default provider + per-field conversion", min(timeit.repeat(old_path, number=1, repeat=repeat)), len(old_body)),
+        (f"FastJSONProvider ({'orjson' if orjson else 'stdlib fallback'})", min(timeit.repeat(new_path, number=1, repeat=repeat)), len(new_body)),
+    ]
+
+    print(f"{rows} customers, best of {repeat}")
+    for name, seconds, size in results:
+        print(f"  {name:<45} {seconds * 1000:8.1f} ms  {size / 1024:8.1f} KiB")
+    for level in (1, 5, 9):
+        seconds = min(timeit.repeat(lambda: gzip.compress(new_body, compresslevel=level), number=1, repeat=repeat))
+        size = len(gzip.compress(new_body, compresslevel=level))
+        print(f"  {'gzip level ' + str(level):<45} {seconds * 1000:8.1f} ms  {size / 1024:8.1f} KiB")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
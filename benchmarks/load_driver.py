@@ -0,0 +1,333 @@
+'''
+    Repeatable load driver for every API route.
+    Drives the app in-process through the Flask test client (default) or a running server (--url),
+    with seeded request parameters drawn from the benchmark database (see benchmarks.dataset).
+    Reports p50/p95/p99 latency, throughput and per-endpoint query counts (from the Server-Timing header) as JSON,
+    and --compare prints the change against an earlier run's JSON.
+    Run with: python -m benchmarks.load_driver [--db URI] [--url http://host:port] [--requests N] [--concurrency N] [--writes] [--out FILE] [--compare FILE]
+'''
+import argparse
+import json
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from sqlalchemy import func
+from .dataset import DEFAULT_DB, STAFF_PASSWORD, benchmark_app
+
+_SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+# Distinct search terms and rentals sampled from the database up front
+SAMPLE_SIZE = 50
+
+
+class Endpoint:
+    '''
+        One route under load: make(rng, ctx) returns the (path, json body or None) of the next request,
+        and on_response(ctx, status, body), when given, hands created ids to the endpoints that consume them.
+    '''
+
+    def __init__(self, name: str, method: str, make, auth: bool = False, write: bool = False, on_response=None):
+        self.name = name
+        self.method = method
+        self.make = make
+        self.auth = auth
+        self.write = write
+        self.on_response = on_response
+
+
+class Context:
+    ''' Id ranges and samples from the database, plus ids created by write endpoints for later ones to consume '''
+
+    def __init__(self, app):
+        from app.db import get_session, models
+        with app.app_context():
+            session = get_session()
+            film, actor, customer, rental, category = models["film"], models["actor"], models["customer"], models["rental"], models["category"]
+            self.max_film = session.query(func.max(film.film_id)).scalar() or 1
+            self.max_actor = session.query(func.max(actor.actor_id)).scalar() or 1
+            self.max_customer = session.query(func.max(customer.customer_id)).scalar() or 1
+            self.max_rental = session.query(func.max(rental.rental_id)).scalar() or 1
+            self.title_terms = sorted({t.split()[0] for (t,) in session.query(film.title).limit(SAMPLE_SIZE)})
+            self.text_terms = sorted({w for (d,) in session.query(film.description).limit(SAMPLE_SIZE) for w in (d or "").split() if len(w) > 3}) or self.title_terms
+            self.actor_terms = sorted({n for (n,) in session.query(actor.last_name).limit(SAMPLE_SIZE)})
+            self.genre_terms = sorted({n for (n,) in session.query(category.name).limit(SAMPLE_SIZE)})
+            self.customer_terms = sorted({n[:3] for (n,) in session.query(customer.last_name).limit(SAMPLE_SIZE)})
+            open_rentals = (
+                session.query(rental.rental_id, rental.customer_id)
+                .filter(rental.return_date.is_(None))
+                .order_by(rental.rental_id)
+                .limit(10 * SAMPLE_SIZE)
+            ).all()
+        self.open_rentals = queue.Queue()
+        for rental_id, customer_id in open_rentals:
+            self.open_rentals.put((rental_id, customer_id))
+        self.created_customers = queue.Queue()
+
+    def ranges(self):
+        return {"film": self.max_film, "actor": self.max_actor, "customer": self.max_customer, "rental": self.max_rental}
+
+''' Take an id a write endpoint left behind, or None when there is nothing to consume '''
+def _take(q):
+    try:
+        return q.get_nowait()
+    except queue.Empty:
+        return None
+
+def _return_open_rental(rng, ctx):
+    taken = _take(ctx.open_rentals)
+    return (f"/api/rentals/{taken[0] if taken else rng.randint(1, ctx.max_rental)}/return", None)
+
+def _return_customer_rental(rng, ctx):
+    taken = _take(ctx.open_rentals) or (rng.randint(1, ctx.max_rental), rng.randint(1, ctx.max_customer))
+    return (f"/api/customers/{taken[1]}/rentals/{taken[0]}/return", None)
+
+def _bulk_return(rng, ctx):
+    ids = [t[0] for t in (_take(ctx.open_rentals) for _ in range(5)) if t]
+    return ("/api/rentals/bulk/return", {"rental_ids": ids or [rng.randint(1, ctx.max_rental)]})
+
+def _delete_customer(rng, ctx):
+    customer_id = _take(ctx.created_customers)
+    return (f"/api/customers/{customer_id or ctx.max_customer + 1}", None)
+
+def _customer_created(ctx, status, body):
+    if status == 201:
+        ctx.created_customers.put(json.loads(body)["customer_id"])
+
+def _rental_created(ctx, status, body):
+    if status == 201:
+        rental = json.loads(body)
+        ctx.open_rentals.put((rental["rental_id"], rental["customer_id"]))
+
+def _customer_payload(rng):
+    return {"first_name": "LOAD", "last_name": f"DRIVER{rng.randint(1, 10 ** 6)}", "email": "load@driver.test", "store_id": 1, "address_id": 1}
+
+''' Every route in routes/, reads first; write endpoints only run with --writes '''
+ENDPOINTS = [
+    Endpoint("health", "GET", lambda rng, ctx: ("/api/health", None)),
+    Endpoint("films.top5", "GET", lambda rng, ctx: ("/api/films/top5", None)),
+    Endpoint("films.detail", "GET", lambda rng, ctx: (f"/api/films/{rng.randint(1, ctx.max_film)}", None)),
+    Endpoint("films.search_title", "GET", lambda rng, ctx: (f"/api/films/search/title?q={rng.choice(ctx.title_terms)}", None)),
+    Endpoint("films.search_actor", "GET", lambda rng, ctx: (f"/api/films/search/actor?q={rng.choice(ctx.actor_terms)}", None)),
+    Endpoint("films.search_genre", "GET", lambda rng, ctx: (f"/api/films/search/genre?q={rng.choice(ctx.genre_terms)}", None)),
+    Endpoint("films.search", "GET", lambda rng, ctx: (f"/api/films/search?q={rng.choice(ctx.title_terms + ctx.actor_terms + ctx.genre_terms)}&limit=20", None)),
+    Endpoint("films.search_text", "GET", lambda rng, ctx: (f"/api/films/search/text?q={rng.choice(ctx.text_terms)}&limit=20", None)),
+    Endpoint("actors.detail", "GET", lambda rng, ctx: (f"/api/actors/{rng.randint(1, ctx.max_actor)}", None)),
+    Endpoint("actors.top5", "GET", lambda rng, ctx: ("/api/actors/top5", None)),
+    Endpoint("actors.top_films", "GET", lambda rng, ctx: (f"/api/actors/{rng.randint(1, ctx.max_actor)}/top5films", None)),
+    Endpoint("customers.page", "GET", lambda rng, ctx: ("/api/customers/?limit=50", None)),
+    Endpoint("customers.search", "GET", lambda rng, ctx: (f"/api/customers/search?q={rng.choice(ctx.customer_terms)}&limit=50", None)),
+    Endpoint("customers.detail", "GET", lambda rng, ctx: (f"/api/customers/{rng.randint(1, ctx.max_customer)}", None)),
+    Endpoint("customers.rentals", "GET", lambda rng, ctx: (f"/api/customers/{rng.randint(1, ctx.max_customer)}/rentals?limit=20", None), auth=True),
+    Endpoint("rentals.detail", "GET", lambda rng, ctx: (f"/api/rentals/{rng.randint(1, ctx.max_rental)}", None)),
+    Endpoint("auth.verify", "POST", lambda rng, ctx: ("/api/auth/verify", {"token": ctx.token})),
+    Endpoint("admin.pool", "GET", lambda rng, ctx: ("/api/admin/pool", None), auth=True),
+    Endpoint("auth.login", "POST", lambda rng, ctx: ("/api/auth/login", {"username": ctx.username, "password": ctx.password})),
+    Endpoint("customers.create", "POST", lambda rng, ctx: ("/api/customers/", _customer_payload(rng)), write=True, on_response=_customer_created),
+    Endpoint("customers.update", "PUT", lambda rng, ctx: (f"/api/customers/{rng.randint(1, ctx.max_customer)}", {"email": f"updated{rng.randint(1, 10 ** 6)}@driver.test"}), auth=True, write=True),
+    Endpoint("customers.delete", "DELETE", _delete_customer, auth=True, write=True),
+    Endpoint("rentals.create", "POST", lambda rng, ctx: ("/api/rentals/", {"customer_id": rng.randint(1, ctx.max_customer), "film_id": rng.randint(1, ctx.max_film)}), auth=True, write=True, on_response=_rental_created),
+    Endpoint("rentals.bulk_create", "POST", lambda rng, ctx: ("/api/rentals/bulk", {"customer_id": rng.randint(1, ctx.max_customer), "film_ids": [rng.randint(1, ctx.max_film) for _ in range(5)]}), auth=True, write=True),
+    Endpoint("rentals.return", "PUT", _return_open_rental, auth=True, write=True),
+    Endpoint("customers.return_rental", "PUT", _return_customer_rental, auth=True, write=True),
+    Endpoint("rentals.bulk_return", "PUT", _bulk_return, auth=True, write=True),
+    # Streams every customer, so it runs last and with few requests (see --stream-requests)
+    Endpoint("customers.stream", "GET", lambda rng, ctx: ("/api/customers/?stream=1", None)),
+]
+
+
+class InProcessTarget:
+    ''' Sends requests through a Flask test client (one per thread) '''
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, method, path, body, headers):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body, headers=headers)
+        payload = response.get_data()
+        response.close()
+        return response.status_code, response.headers.get("Server-Timing"), payload
+
+
+class HttpTarget:
+    ''' Sends requests to a running server '''
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+
+    def send(self, method, path, body, headers):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method, headers=dict(headers))
+        if data is not None:
+            request.add_header("Content-Type", "application/json")
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.headers.get("Server-Timing"), response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get("Server-Timing"), e.read()
+
+''' Nearest-rank percentile of an ascending list '''
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))]
+
+''' Fire requests at one endpoint from concurrency threads and summarize the timings '''
+def run_endpoint(target, endpoint, ctx, requests: int, concurrency: int, warmup: int, seed: int):
+    headers = {"Authorization": f"Bearer {ctx.token}"} if endpoint.auth else {}
+    samples = []
+    lock = threading.Lock()
+
+    def worker(index, count, record):
+        rng = random.Random(f"{seed}:{endpoint.name}:{index}:{record}")
+        for _ in range(count):
+            path, body = endpoint.make(rng, ctx)
+            started = time.perf_counter()
+            status, server_timing, payload = target.send(endpoint.method, path, body, headers)
+            elapsed = time.perf_counter() - started
+            if endpoint.on_response:
+                endpoint.on_response(ctx, status, payload)
+            if record:
+                match = _SERVER_TIMING_DB.search(server_timing or "")
+                with lock:
+                    samples.append((elapsed, status, int(match.group(2)) if match else None, float(match.group(1)) if match else None))
+
+    def run(total, record):
+        shares = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+        threads = [threading.Thread(target=worker, args=(i, n, record)) for i, n in enumerate(shares) if n]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    run(warmup, False)
+    started = time.perf_counter()
+    run(requests, True)
+    wall = time.perf_counter() - started
+
+    latencies = sorted(s[0] * 1000 for s in samples)
+    queries = [s[2] for s in samples if s[2] is not None]
+    db_ms = [s[3] for s in samples if s[3] is not None]
+    statuses = {}
+    for s in samples:
+        statuses[str(s[1])] = statuses.get(str(s[1]), 0) + 1
+    return {
+        "method": endpoint.method,
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if s[1] >= 500),
+        "statuses": statuses,
+        "throughput_rps": round(len(samples) / wall, 1) if wall else None,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "p50": round(percentile(latencies, 0.50), 3) if latencies else None,
+            "p95": round(percentile(latencies, 0.95), 3) if latencies else None,
+            "p99": round(percentile(latencies, 0.99), 3) if latencies else None,
+            "max": round(latencies[-1], 3) if latencies else None,
+        },
+        "queries": {
+            "mean": round(sum(queries) / len(queries), 2) if queries else None,
+            "max": max(queries) if queries else None,
+        },
+        "db_ms_mean": round(sum(db_ms) / len(db_ms), 3) if db_ms else None,
+    }
+
+''' Print p50/p95/p99 and query-count changes of this run against a baseline run '''
+def compare(baseline: dict, current: dict, out=sys.stderr):
+    print(f"{'endpoint':<26} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18} {'queries':>14}", file=out)
+
+    def cell(old, new):
+        if old is None or new is None:
+            return f"{'-' if new is None else new:>18}"
+        change = f"{(new - old) / old * 100:+.0f}%" if old else ""
+        return f"{f'{old}->{new} {change}':>18}"
+
+    for name, result in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if before is None:
+            continue
+        print(
+            f"{name:<26} "
+            + " ".join(cell(before["latency_ms"][p], result["latency_ms"][p]) for p in ("p50", "p95", "p99"))
+            + f" {str(before['queries']['mean']) + '->' + str(result['queries']['mean']):>14}",
+            file=out
+        )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive load at every API route and report latency, throughput and query counts")
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLAlchemy URI of the benchmark database (for request parameters and in-process runs)")
+    parser.add_argument("--url", help="base URL of a running server; defaults to driving the app in-process")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per endpoint")
+    parser.add_argument("--stream-requests", type=int, default=3, help="timed requests for the full customer stream")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests per endpoint before timing")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--writes", action="store_true", help="also drive the endpoints that modify data")
+    parser.add_argument("--only", help="comma-separated endpoint names to run")
+    parser.add_argument("--username", default="staff1")
+    parser.add_argument("--password", default=STAFF_PASSWORD)
+    parser.add_argument("--out", help="write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    app = benchmark_app(args.db)
+    ctx = Context(app)
+    ctx.username, ctx.password = args.username, args.password
+    target = HttpTarget(args.url) if args.url else InProcessTarget(app)
+
+    status, _, body = target.send("POST", "/api/auth/login", {"username": args.username, "password": args.password}, {})
+    if status != 200:
+        raise SystemExit(f"Login as {args.username} failed ({status}): {body[:200]!r}")
+    ctx.token = json.loads(body)["token"]
+
+    only = set(args.only.split(",")) if args.only else None
+    endpoints = [e for e in ENDPOINTS if (args.writes or not e.write) and (only is None or e.name in only)]
+
+    results = {}
+    for endpoint in endpoints:
+        streaming = endpoint.name == "customers.stream"
+        results[endpoint.name] = run_endpoint(
+            target, endpoint, ctx,
+            requests=args.stream_requests if streaming else args.requests,
+            concurrency=1 if streaming else args.concurrency,
+            warmup=0 if streaming else args.warmup,
+            seed=args.seed,
+        )
+        r = results[endpoint.name]
+        print(f"{endpoint.name:<26} p50 {r['latency_ms']['p50']} ms  p99 {r['latency_ms']['p99']} ms  {r['throughput_rps']} req/s  {r['queries']['mean']} queries", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "target": args.url or "in-process",
+            "db": args.db,
+            "seed": args.seed,
+            "requests_per_endpoint": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "writes": args.writes,
+            "dataset": ctx.ranges(),
+        },
+        "endpoints": results,
+    }
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
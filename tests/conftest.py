@@ -0,0 +1,42 @@
+import os
+import pytest
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key-not-for-production-use")
+
+from benchmarks.dataset import DatasetGenerator, build
+
+# Small enough to build in a couple of seconds, large enough for ties, misses and multi-actor films
+SCALE = {"stores": 2, "films": 60, "actors": 20, "customers": 30, "rentals": 400}
+
+''' A generated Sakila database in SQLite, shared by the whole test session '''
+@pytest.fixture(scope="session")
+def sakila_uri(tmp_path_factory):
+    path = tmp_path_factory.mktemp("sakila") / "sakila.db"
+    uri = f"sqlite:///{path}"
+    build(uri, DatasetGenerator(seed=1, **SCALE))
+    return uri
+
+''' Each test's apps start from empty in-memory leaderboards and search index, whatever an earlier app built '''
+@pytest.fixture(autouse=True)
+def reset_process_caches():
+    from app.leaderboard import leaderboards
+    from app.search_index import film_search_index
+    for cache in (leaderboards, film_search_index):
+        cache.enabled = False
+        cache._state = None
+
+''' A config class on the test database; overrides become class attributes '''
+@pytest.fixture
+def make_config(sakila_uri, tmp_path):
+    from app.config import DevelopmentConfig
+
+    def make(**overrides):
+        settings = {
+            "SQLALCHEMY_DATABASE_URI": sakila_uri,
+            "SQLALCHEMY_ENGINE_OPTIONS": {},
+            "SHARED_CACHE_PATH": str(tmp_path / "cache" / "shared.sqlite3"),
+            "TESTING": True,
+        }
+        settings.update(overrides)
+        return type("TestConfig", (DevelopmentConfig,), settings)
+    return make
@@ -0,0 +1,92 @@
+import pytest
+from starlette.testclient import TestClient
+from app.asgi import create_asgi_app
+from app.shared_cache import shared_cache
+
+''' The ASGI app on the aiosqlite stand-in, with the in-memory search index off so the searches run natively '''
+@pytest.fixture
+def asgi_app(make_config):
+    return create_asgi_app(make_config(SEARCH_INDEX_ENABLED=False))
+
+@pytest.fixture
+def client(asgi_app):
+    with TestClient(asgi_app) as client:
+        yield client
+
+@pytest.fixture
+def flask_client(asgi_app):
+    return asgi_app.state.flask_app.test_client()
+
+def _paths(app):
+    return [route.path for route in app.routes]
+
+def test_film_detail_matches_flask(client, flask_client):
+    response = client.get("/api/films/5")
+    expected = flask_client.get("/api/films/5")
+    assert response.status_code == 200
+    assert response.json() == expected.get_json()
+    assert response.headers["etag"] == expected.headers["ETag"]
+
+def test_film_detail_not_modified(client):
+    response = client.get("/api/films/5")
+    etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+    assert client.get("/api/films/5", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/films/5", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/api/films/5", headers={"If-None-Match": 'W/"stale"'}).status_code == 200
+
+def test_missing_film_is_404(client):
+    response = client.get("/api/films/999999")
+    assert response.status_code == 404
+    assert response.json() == {"error": "Film not found"}
+
+def test_actor_detail(client, flask_client):
+    response = client.get("/api/actors/3")
+    assert response.status_code == 200
+    assert response.json() == flask_client.get("/api/actors/3").get_json()
+    assert client.get("/api/actors/3", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    assert client.get("/api/actors/999999").status_code == 404
+
+def test_film_detail_shares_the_flask_cache_entry(client, flask_client, monkeypatch):
+    from app.services import film_service
+
+    shared_cache.clear()
+    response = client.get("/api/films/7")
+
+    def no_query(film_ids):
+        raise AssertionError("film details were queried instead of read from the shared cache")
+    monkeypatch.setattr(film_service, "film_details", no_query)
+    expected = flask_client.get("/api/films/7")
+    assert expected.status_code == 200
+    assert expected.get_json() == response.json()
+
+def test_actor_search_runs_natively(asgi_app, client):
+    assert "/api/films/search/actor" in _paths(asgi_app)
+    first_name = client.get("/api/actors/1").json()["first_name"]
+    response = client.get(f"/api/films/search/actor?q={first_name.lower()}")
+    assert response.status_code == 200
+    films = response.json()
+    assert films
+    assert all(any(first_name in actor["full_name"] for actor in film["actors"]) for film in films)
+    assert client.get(f"/api/films/search/actor?q={first_name.lower()}", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+@pytest.mark.parametrize("kind, term", [("title", "a"), ("genre", "act")])
+def test_title_and_genre_search(client, flask_client, kind, term):
+    response = client.get(f"/api/films/search/{kind}?q={term}")
+    assert response.status_code == 200
+    assert response.json() == flask_client.get(f"/api/films/search/{kind}?q={term}").get_json()
+
+def test_search_requires_a_term(client):
+    assert client.get("/api/films/search/title").status_code == 400
+
+def test_leaderboard_routes_go_to_flask(asgi_app, client, flask_client):
+    assert "/api/films/top5" not in _paths(asgi_app)
+    response = client.get("/api/films/top5")
+    assert response.status_code == 200
+    assert response.json() == flask_client.get("/api/films/top5").get_json()
+    assert "etag" in response.headers
+
+def test_searches_stay_on_flask_with_the_index(make_config):
+    app = create_asgi_app(make_config(SEARCH_INDEX_ENABLED=True))
+    assert "/api/films/search/title" not in _paths(app)
+    with TestClient(app) as client:
+        assert client.get("/api/films/search/title?q=a").status_code == 200